@@ -4,77 +4,71 @@
 # Chomper.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 26/02/2018
-# Last updated 26/02/2018
+# Last updated 18/10/2026
 # Description: Reads an input .csv, filters text to remove any characters that 
 #              might cause grief in FME, writes filtered text to a new .csv
 #              The filter removes all non ASCII characters, then removes the
 #              non-printing ASCII controls and specific symbols ( @ ` # $ % & ' * ^ ~)
 #              Also truncates text to 50 characters per field
+#              The filter itself lives in chomplib.py
+#              Optional third parameter sets the number of processes used to
+#              clean the file in parallel (run the tool out of process).
+#              Optional fourth parameter turns on incremental mode for
+#              append-only inputs: a checkpoint is kept next to the output
+#              (<output>.chomp.json) and reruns only clean the new rows.
 #
 # teststr = "Klüft @ # $ % ^ & * ~  \t\t skräms  inför \npå fédéral éle`ctor'al große"
 # u_teststr = u"Klüft @ # $ % ^ & * ~  \t\t skräms inför \npå fédéral éle`ctor'al große"
 #---------------------------------------------------------------------------
 
 # Import modules
-import arcpy, time, unicodedata, re, sys, csv
+import arcpy, time, sys
+from chomplib import clean_csv, clean_csv_parallel, clean_csv_incremental
+from poolutils import parse_processes
 reload(sys)
 
 # encoding=utf8  
 sys.setdefaultencoding('utf8')
 
-# User-supplied parameters
-in_csv_file = arcpy.GetParameterAsText(0)
-out_csv_file = arcpy.GetParameterAsText(1)
+if __name__ == '__main__':
 
-# Local variables
-control_chars = ''.join(map(unichr, range(0,32)))
-delete = '\x7f'
-control_chars = control_chars + delete
-control_char_re = re.compile('[%s]' % re.escape(control_chars))
-symbol_chars = u'\x40\x60\x23\x24\x25\x26\x27\x2A\x5E\x7E'
-symbol_chars_re = re.compile('[%s]' % re.escape(symbol_chars))
-rows = []
- 
-# Functions
-def Chomper(txt):
-    utxt = unicode(txt)
-    normalised = unicodedata.normalize('NFKD', utxt).encode('ascii','ignore')
-    nocontrolchars = control_char_re.sub('', normalised)
-    nosymbol = symbol_chars_re.sub('', nocontrolchars)
-    stripped = " ".join(nosymbol.split())
-    return stripped
+    # User-supplied parameters
+    in_csv_file = arcpy.GetParameterAsText(0)
+    out_csv_file = arcpy.GetParameterAsText(1)
+    processes = parse_processes(arcpy.GetParameterAsText(2)) # Optional. Blank = 1, 0 = one per core
+    incremental = arcpy.GetParameterAsText(3).lower() == "true" # Optional boolean
 
-# Setup status output
-scriptName = 'Chomper.py'
-StartTime = time.strftime("%#c", time.localtime())
-startText = "____________________Script started successfully.____________________"
-arcpy.AddMessage(" " * 3)
-arcpy.AddMessage("         -<>-<>-<>-" * 3)
-arcpy.AddMessage(" ")
-arcpy.AddMessage(startText)
-arcpy.AddMessage("\n")
-arcpy.AddMessage(StartTime)
+    # Setup status output
+    scriptName = 'Chomper.py'
+    StartTime = time.strftime("%#c", time.localtime())
+    startText = "____________________Script started successfully.____________________"
+    arcpy.AddMessage(" " * 3)
+    arcpy.AddMessage("         -<>-<>-<>-" * 3)
+    arcpy.AddMessage(" ")
+    arcpy.AddMessage(startText)
+    arcpy.AddMessage("\n")
+    arcpy.AddMessage(StartTime)
 
-# Main            
-with open(in_csv_file, 'rb') as in_csv:
-    csv_reader = csv.reader(in_csv)
-    for row in csv_reader:
-        newrow = []
-        for cell in row:
-            newrow.append(Chomper(cell[:50]))
-        rows.append(newrow)
+    # Main
+    # Rows are cleaned and written one at a time so memory use stays flat
+    # regardless of the size of the input file. With more than one process the
+    # file is split into chunks on record boundaries and cleaned in parallel.
+    if incremental:
+        rowCount, totalRows = clean_csv_incremental(in_csv_file, out_csv_file, processes,
+                                                    report=arcpy.AddMessage)
+        arcpy.AddMessage("{} rows in the output".format(totalRows))
+    elif processes > 1:
+        rowCount = clean_csv_parallel(in_csv_file, out_csv_file, processes, report=arcpy.AddMessage)
+    else:
+        rowCount = clean_csv(in_csv_file, out_csv_file, report=arcpy.AddMessage)
 
-with open(out_csv_file, 'wb') as out_csv:
-    writer = csv.writer(out_csv)
-    writer.writerows(rows)
+    arcpy.AddMessage("Total of {} rows cleaned".format(rowCount))
 
 
-
-# Final status output
-arcpy.AddMessage("\nStarted  " + scriptName)
-arcpy.AddMessage(StartTime)
-arcpy.AddMessage("\nFinished " + scriptName)
-finishTime = time.strftime("%#c", time.localtime())
-arcpy.AddMessage(finishTime)
-arcpy.AddMessage("\n=====================================================================")
-
+    # Final status output
+    arcpy.AddMessage("\nStarted  " + scriptName)
+    arcpy.AddMessage(StartTime)
+    arcpy.AddMessage("\nFinished " + scriptName)
+    finishTime = time.strftime("%#c", time.localtime())
+    arcpy.AddMessage(finishTime)
+    arcpy.AddMessage("\n=====================================================================")
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+#---------------------------------------------------------------------------
+#
+# ChomperBenchmark.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Micro-benchmark of the single pass Chomper() against the
+#              original regex chain (ChomperRegex) on generated address data.
+#              Checks that both produce identical output before timing.
+#              Run from the command line:  python ChomperBenchmark.py [rows]
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+from __future__ import print_function
+import random, sys, timeit
+from chomplib import Chomper, ChomperRegex, ChompRow
+
+# Local variables
+rowCount = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+streets = [u"Smith", u"Gold Coast", u"Ferry", u"Bundall", u"Nerang-Broadbeach", u"O'Reilly",
+           u"Schönberg", u"Département", u"Café Hill", u"Müller", u"Château"]
+types = [u"St", u"Rd", u"Ave", u"Hwy", u"Cres", u"Ct", u"Pde"]
+suburbs = [u"SOUTHPORT", u"SURFERS PARADISE", u"ROBINA", u"BURLEIGH HEADS", u"COOLANGATTA"]
+noise = [u"", u"", u"", u"  ", u"\t", u"\n", u" #", u" @", u" ", u" & ", u"*"]
+
+
+# Functions
+def as_cell(txt):
+    # csv.reader yields utf-8 byte strings on Python 2 and text on Python 3
+    return txt.encode('utf-8') if sys.version_info[0] == 2 else txt
+
+
+def address_rows(n):
+    rnd = random.Random(2018)
+    for i in range(n):
+        unit = u"U{}/".format(rnd.randint(1, 40)) if rnd.random() < 0.2 else u""
+        street = u"{}{} {} {}{}".format(unit, rnd.randint(1, 999), rnd.choice(streets),
+                                        rnd.choice(types), rnd.choice(noise))
+        yield [as_cell(u"{}".format(i)), as_cell(street), as_cell(rnd.choice(suburbs)),
+               as_cell(u"{}".format(4200 + rnd.randint(0, 30)))]
+
+
+# Main
+rows = list(address_rows(rowCount))
+cells = [cell for row in rows for cell in row]
+for cell in cells:
+    if Chomper(cell) != ChomperRegex(cell):
+        raise ValueError("Chomper() differs from ChomperRegex() for {!r}".format(cell))
+
+regexTime = min(timeit.repeat(lambda: [ChomperRegex(c) for c in cells], number=1, repeat=3))
+fastTime = min(timeit.repeat(lambda: [Chomper(c) for c in cells], number=1, repeat=3))
+rowTime = min(timeit.repeat(lambda: [ChompRow(r) for r in rows], number=1, repeat=3))
+
+print("{} cells ({} rows), output identical".format(len(cells), rowCount))
+print("ChomperRegex  {:8.3f} s  {:10.0f} cells/s".format(regexTime, len(cells) / regexTime))
+print("Chomper       {:8.3f} s  {:10.0f} cells/s".format(fastTime, len(cells) / fastTime))
+print("ChompRow      {:8.3f} s  {:10.0f} rows/s".format(rowTime, rowCount / rowTime))
+print("Speed up      {:8.1f} x".format(regexTime / fastTime))
@@ -4,63 +4,92 @@
 # CropJPEG.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 12/05/2017
-# Last updated 12/05/2017
-# Description: 
+# Last updated 18/10/2026
+# Description: Crops every *.jpg in a directory to the given map element
+#              extents and saves each as Sheet_NN.jpg in the same directory.
+#              Optional sixth parameter sets the number of processes used to
+#              crop sheets in parallel (run the tool out of process).
+#              Optional seventh parameter turns on lossless cropping: the box's
+#              left and top are snapped out to the JPEG block grid (up to 15 px)
+#              and jpegtran copies the compressed blocks without re-encoding.
+#              Sheets that cannot be cropped that way are decoded as before.
+#              Optional eighth parameter lists extra regions to cut from each
+#              sheet as name=left,top,right,bottom;name=... Each is saved as
+#              <name>_NN.jpg alongside Sheet_NN.jpg, from a single decode.
+#              A manifest (CropJPEG_manifest.json) in the jpeg directory records
+#              a hash of each source, its boxes and its outputs. Sheets that
+#              have not changed since the last run are skipped.
+#              Leave the four extents blank to detect the map frame border on
+#              the first sheet and use that box for the whole batch.
 #
 #---------------------------------------------------------------------------
 
 # Import modules
-import os, arcpy, time
-from PIL import Image
+import os, sys, arcpy, time
+from croplib import sheet_tasks, crop_sheets, find_jpegtran, parse_regions, load_manifest, save_manifest, \
+    detect_frame_box
+from poolutils import parse_processes
 
-# User-supplied parameters
-jpegDir = arcpy.GetParameterAsText(0) # Get path to jpeg directory
-top = float(arcpy.GetParameterAsText(1))# Get map element extents for cropping
-left = float(arcpy.GetParameterAsText(2))
-right = float(arcpy.GetParameterAsText(3))
-bottom = float(arcpy.GetParameterAsText(4))
-box = (left, top, right, bottom)
+if __name__ == '__main__':
 
-# Local variables
-counter = 0
+    # User-supplied parameters
+    jpegDir = arcpy.GetParameterAsText(0) # Get path to jpeg directory
+    extents = [arcpy.GetParameterAsText(i).strip().strip("#") for i in (1, 2, 3, 4)] # Get map element extents for cropping
+    autoDetect = not any(extents) # Blank extents = detect the map frame
+    if not autoDetect and not all(extents):
+        arcpy.AddError("Give all four extents or none (to detect the map frame).")
+        sys.exit(1)
+    if not autoDetect:
+        top, left, right, bottom = [float(e) for e in extents]
+        box = (left, top, right, bottom)
+    else:
+        box = None
+    processes = parse_processes(arcpy.GetParameterAsText(5)) # Optional. Blank = 1, 0 = one per core
+    lossless = arcpy.GetParameterAsText(6).lower() == "true" # Optional boolean
+    regions = [("Sheet", box)] + parse_regions(arcpy.GetParameterAsText(7)) # Optional extra regions
 
-# Setup status output
-scriptName = 'CropJPEG.py'
-StartTime = time.strftime("%#c", time.localtime())
-startText = "____________________Script started successfully.____________________"
-arcpy.AddMessage(" " * 3)
-arcpy.AddMessage("         -<>-<>-<>-" * 3)
-arcpy.AddMessage(" ")
-arcpy.AddMessage(startText)
-arcpy.AddMessage("\n")
-arcpy.AddMessage(StartTime)
+    # Setup status output
+    scriptName = 'CropJPEG.py'
+    StartTime = time.strftime("%#c", time.localtime())
+    startText = "____________________Script started successfully.____________________"
+    arcpy.AddMessage(" " * 3)
+    arcpy.AddMessage("         -<>-<>-<>-" * 3)
+    arcpy.AddMessage(" ")
+    arcpy.AddMessage(startText)
+    arcpy.AddMessage("\n")
+    arcpy.AddMessage(StartTime)
 
 
-# Setup 
-os.chdir(jpegDir)
-jpgs = os.listdir(jpegDir)
-jpgs.sort()
-total = len(jpgs)
-msg = "\n{} *.jpg files found. \n".format(total)
-arcpy.AddMessage(msg)
+    # Setup 
+    manifest = load_manifest(jpegDir)
+    tasks = sheet_tasks(jpegDir, regions, lossless, manifest)
+    if autoDetect and tasks:
+        sample = tasks[0][0]
+        box, seconds = detect_frame_box(sample)
+        if box is None:
+            arcpy.AddError("Map frame not found on {}. Enter the extents by hand.".format(sample))
+            sys.exit(1)
+        msg = "Map frame detected on {} in {:.0f} ms: left {}, top {}, right {}, bottom {}".format(
+            os.path.basename(sample), seconds * 1000, *box)
+        arcpy.AddMessage(msg)
+        regions[0] = ("Sheet", box)
+        tasks = sheet_tasks(jpegDir, regions, lossless, manifest)
+    total = len(tasks)
+    msg = "\n{} *.jpg files found. \n".format(total)
+    arcpy.AddMessage(msg)
+    if lossless and not find_jpegtran():
+        arcpy.AddWarning("jpegtran not found, lossless crop not available. Decoding every sheet.")
 
-# Main
-for j in jpgs:
-    counter += 1
-    fnum = str(counter)
-    if len(fnum) < 2:
-        fnum = "0{}".format(fnum)
-    if j.endswith(".jpg"):
-        jpg = Image.open(j)
-        region = jpg.crop(box)
-        fname = "Sheet_{}.jpg".format(fnum)
-        region.save(fname, "JPEG")
-        arcpy.AddMessage(fname)
+    # Main
+    try:
+        crop_sheets(tasks, processes, report=arcpy.AddMessage, manifest=manifest)
+    finally:
+        save_manifest(jpegDir, manifest)
 
-# Final status output
-arcpy.AddMessage("\nStarted  " + scriptName)
-arcpy.AddMessage(StartTime)
-arcpy.AddMessage("\nFinished " + scriptName)
-finishTime = time.strftime("%#c", time.localtime())
-arcpy.AddMessage(finishTime)
-arcpy.AddMessage("\n=====================================================================")
+    # Final status output
+    arcpy.AddMessage("\nStarted  " + scriptName)
+    arcpy.AddMessage(StartTime)
+    arcpy.AddMessage("\nFinished " + scriptName)
+    finishTime = time.strftime("%#c", time.localtime())
+    arcpy.AddMessage(finishTime)
+    arcpy.AddMessage("\n=====================================================================")
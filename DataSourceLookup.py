@@ -0,0 +1,65 @@
+#
+#---------------------------------------------------------------------------
+#
+# DataSourceLookup.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Lists the mxds, TOC numbers and layer names that use a data
+# source, from the MXD_DataSource_Inventory.sqlite the DataSourceReport_*_mxds
+# and DataSourceReport_XLS_Multi* scripts keep in the top folder they report on.
+# Run from the command line before moving or renaming a feature class:
+#     python DataSourceLookup.py <mxd folder> C:\Data\Base.gdb\Roads
+#     python DataSourceLookup.py <mxd folder> \\server\gis\Base.gdb --prefix
+#     python DataSourceLookup.py <mxd folder> "*\roads*" --glob
+# Matching ignores case and forward/back slashes. --refresh crawls the folder
+# first (needs arcpy) so the inventory picks up new or changed mxds.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+from __future__ import print_function
+import argparse, os, sys, time
+from datasourcelib import INVENTORY_NAME, crawl, open_inventory
+from poolutils import parse_processes
+
+
+# Functions
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Which mxds use this data source?")
+    parser.add_argument("mxdDir", help="top folder of the mxds (where the inventory is kept)")
+    parser.add_argument("dataSource", help="feature class path, folder/workspace path or wildcard pattern")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--prefix", dest="mode", action="store_const", const="prefix",
+                      help="match everything in a folder, geodatabase or feature dataset")
+    mode.add_argument("--glob", dest="mode", action="store_const", const="glob",
+                      help="match a wildcard pattern (* ? [...])")
+    parser.add_argument("--refresh", action="store_true", help="crawl the mxds first to update the inventory")
+    parser.add_argument("--processes", default="", help="processes used by --refresh (0 = one per core)")
+    parser.set_defaults(mode="exact")
+    args = parser.parse_args(argv)
+
+    if not args.refresh and not os.path.exists(os.path.join(args.mxdDir, INVENTORY_NAME)):
+        parser.error("no {} in {}, run a DataSourceReport script or use --refresh".format(
+            INVENTORY_NAME, args.mxdDir))
+    inventory = open_inventory(args.mxdDir)
+    try:
+        if args.refresh:
+            for relPath, layers in crawl(args.mxdDir, processes=parse_processes(args.processes),
+                                         report=print, inventory=inventory):
+                pass
+        t0 = time.time()
+        matches = inventory.lookup(args.dataSource, args.mode)
+        elapsed = time.time() - t0
+    finally:
+        inventory.close()
+
+    for dataSource, relPath, tocNo, lname in matches:
+        print(dataSource, relPath, tocNo, lname, sep="\t")
+    print("{} layers in {} mxds ({:.3f} s)".format(
+        len(matches), len(set(m[1] for m in matches)), elapsed), file=sys.stderr)
+    return 0 if matches else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
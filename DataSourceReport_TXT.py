@@ -4,18 +4,21 @@
 # DataSourceReport_TXT.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 17/07/2015
-# Last updated 03/08/2015
+# Last updated 18/10/2026
 # Description: Opens an *.txt file listing the data source for each layer in the 
 # top-most dataframe listed in the mxd Table of Contents.
+# Optional parameter checks every unique data source once, in parallel,
+# and adds a STATUS column (OK, MISSING or UNREACHABLE).
 #
 #---------------------------------------------------------------------------
 
 # Import modules
 from __future__ import print_function
 import os, arcpy, time
+from datasourcelib import STATUS_HEADER, check_sources, list_workspace_arcpy, source_key
 
 # User-supplied parameters
-
+checkSources = arcpy.GetParameterAsText(0).lower() == "true" # Optional. Add a STATUS column
 
 # Local variables
 setSpace = 50
@@ -42,17 +45,28 @@ splitPath = os.path.split(mxdPath)
 dataSourceTXT = splitPath[0] + "\\" + splitPath[1][:-4] + "_MXD_DataSource_Report.txt"
 df = arcpy.mapping.ListDataFrames(mxd)[0]
 lyrList = arcpy.mapping.ListLayers(df)
+status = None
+if checkSources:
+    status = check_sources([lyr.dataSource for lyr in lyrList if lyr.supports("DATASOURCE")],
+                           list_workspace=list_workspace_arcpy, report=arcpy.AddMessage)
 
 # Main
 with open(dataSourceTXT, 'w') as outfile:
-    print("LAYER_NAME", "DATA_SOURCE", sep=separator, end="\n", file=outfile)
+    if status is not None:
+        # STATUS lines up with the status on the layer lines below
+        print("LAYER_NAME", "DATA_SOURCE".ljust(setSpace - 10) + " " + STATUS_HEADER, sep=separator, end="\n",
+              file=outfile)
+    else:
+        print("LAYER_NAME", "DATA_SOURCE", sep=separator, end="\n", file=outfile)
     print(line, sep="",end="\n", file=outfile)
     for lyr in lyrList:
-	if lyr.supports("DATASOURCE"):
-	    dSource = os.path.split(lyr.dataSource)[1]
+        if lyr.supports("DATASOURCE"):
+            dSource = os.path.split(lyr.dataSource)[1]
             lname = lyr.name
             space = sp*(setSpace - len(lname))
-	    print(lname, dSource, sep=space, end="\n", file=outfile)
+            if status is not None:
+                dSource = dSource.ljust(setSpace) + " " + status.get(source_key("", lyr.dataSource), "")
+            print(lname, dSource, sep=space, end="\n", file=outfile)
 
 os.startfile(dataSourceTXT)
 
@@ -4,85 +4,64 @@
 # DataSourceReport_TXT_mxds.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 17/07/2015
-# Last updated 31/07/2015
-# Description: Opens an *.xls file listing the data source for each layer in the 
-# top-most dataframe listed in the mxd Table of Contents.
+# Last updated 18/10/2026
+# Description: Opens an *.txt file listing the data source for each layer in the 
+# top-most dataframe listed in the mxd Table of Contents, for every mxd in the
+# directory and its subdirectories. Optional second parameter sets the number
+# of processes used to open the mxds (run the tool out of process).
+# Layers read from each mxd are cached in MXD_DataSource_Inventory.sqlite so
+# reruns only open new or changed mxds.
+# Optional third parameter checks every unique data source once, in parallel,
+# and adds a STATUS column (OK, MISSING or UNREACHABLE).
 #
 #---------------------------------------------------------------------------
 
 # Import modules
 from __future__ import print_function
 import os, arcpy, time
-
-# User-supplied parameters
-mxdDir = arcpy.GetParameterAsText(0)
-
-# Local variables
-dataSourceTXT = mxdDir + "\\MXD_DataSource_Report.txt"
-mxds = [m for m in os.listdir(mxdDir) if m.endswith(".mxd")]
-setSpace = 50
-sp = " "
-separator = sp*setSpace
-line = "---------------------------------------------------------------------------------------"
-
-# Setup status output
-scriptName = 'DataSourceReport_TXT_mxds.py'
-StartTime = time.strftime("%#c", time.localtime())
-startText = "____________________Script started successfully.____________________"
-arcpy.AddMessage(" " * 3)
-arcpy.AddMessage("         -<>-<>-<>-" * 3)
-arcpy.AddMessage(" ")
-arcpy.AddMessage(startText)
-arcpy.AddMessage("\n")
-arcpy.AddMessage(StartTime)
-
-
-# Main
-with open(dataSourceTXT, 'w') as outfile:
-    for mx in mxds:
-        print(mx)
-        nextMxd = mxdDir + "\\" + mx
-        mxd = arcpy.mapping.MapDocument(nextMxd)
-        df = arcpy.mapping.ListDataFrames(mxd)[0]
-        lyrList = arcpy.mapping.ListLayers(df)
-        print("                           ", mx, sep="",end="\n", file=outfile)
-        print("LAYER_NAME", "DATA_SOURCE", sep=separator, end="\n", file=outfile)
-        print(line, sep="",end="\n", file=outfile)
-        for lyr in lyrList:
-            if lyr.supports("DATASOURCE"):
-	        dSource = os.path.split(lyr.dataSource)[1]
-                lname = lyr.name
-                space = sp*(setSpace - len(lname))
-	        print(lname, dSource, sep=space, end="\n", file=outfile)
-        print(line, sep="",end="\n" * 5, file=outfile)
-
-os.startfile(dataSourceTXT)
-
-# Final status output
-arcpy.AddMessage("\nStarted  " + scriptName)
-arcpy.AddMessage(StartTime)
-arcpy.AddMessage("\nFinished " + scriptName)
-finishTime = time.strftime("%#c", time.localtime())
-arcpy.AddMessage(finishTime)
-arcpy.AddMessage("\n=====================================================================")
-
-
-
-
-"""
-
-
-
-
-
-"""
-
-
-
-
-
-
-
-
-
-
+from datasourcelib import check_sources, crawl, layer_sources, list_workspace_arcpy, open_inventory, write_txt_report
+from poolutils import parse_processes
+
+if __name__ == '__main__':
+
+    # User-supplied parameters
+    mxdDir = arcpy.GetParameterAsText(0)
+    processes = parse_processes(arcpy.GetParameterAsText(1)) # Optional. Blank = 1, 0 = one per core
+    checkSources = arcpy.GetParameterAsText(2).lower() == "true" # Optional. Add a STATUS column
+
+    # Local variables
+    dataSourceTXT = mxdDir + "\\MXD_DataSource_Report.txt"
+
+    # Setup status output
+    scriptName = 'DataSourceReport_TXT_mxds.py'
+    StartTime = time.strftime("%#c", time.localtime())
+    startText = "____________________Script started successfully.____________________"
+    arcpy.AddMessage(" " * 3)
+    arcpy.AddMessage("         -<>-<>-<>-" * 3)
+    arcpy.AddMessage(" ")
+    arcpy.AddMessage(startText)
+    arcpy.AddMessage("\n")
+    arcpy.AddMessage(StartTime)
+
+
+    # Main
+    inventory = open_inventory(mxdDir)
+    try:
+        results = crawl(mxdDir, processes=processes, report=arcpy.AddMessage, inventory=inventory)
+        status = None
+        if checkSources:
+            results = list(results)
+            status = check_sources(layer_sources(results), list_workspace=list_workspace_arcpy, report=arcpy.AddMessage)
+        write_txt_report(dataSourceTXT, results, status)
+    finally:
+        inventory.close()
+
+    os.startfile(dataSourceTXT)
+
+    # Final status output
+    arcpy.AddMessage("\nStarted  " + scriptName)
+    arcpy.AddMessage(StartTime)
+    arcpy.AddMessage("\nFinished " + scriptName)
+    finishTime = time.strftime("%#c", time.localtime())
+    arcpy.AddMessage(finishTime)
+    arcpy.AddMessage("\n=====================================================================")
@@ -4,18 +4,24 @@
 # DataSourceReport_XLS.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 17/07/2015
-# Last updated 27/07/2015
+# Last updated 18/10/2026
 # Description: Opens an *.xls file listing the data source for each layer in the 
 # top-most dataframe listed in the mxd Table of Contents.
+# Optional parameter picks the report format: xls (default), xlsx or csv.
+# Optional second parameter checks every unique data source once, in parallel,
+# and adds a STATUS column (OK, MISSING or UNREACHABLE).
 #
 #---------------------------------------------------------------------------
 
 # Import modules
 # from __future__ import print_function
-import os, arcpy, time, xlwt
+import os, arcpy, time
+from datasourcelib import STATUS_HEADER, check_sources, list_workspace_arcpy, source_key
+from reportwriters import open_report, parse_format
 
 # User-supplied parameters
-
+reportFormat = parse_format(arcpy.GetParameterAsText(0)) # Optional. xls (default), xlsx or csv
+checkSources = arcpy.GetParameterAsText(1).lower() == "true" # Optional. Add a STATUS column
 
 # Local variables
 header = ["TOC_NO", "LAYER_NAME", "FEATURE_CLASS", "DATA_SOURCE"]
@@ -39,28 +45,30 @@ arcpy.AddMessage(StartTime)
 mxd = arcpy.mapping.MapDocument("CURRENT")
 mxdPath = str(mxd.filePath)
 splitPath = os.path.split(mxdPath)
-dataSourceXLS = splitPath[0] + "\\" + splitPath[1][:-4] + "_MXD_DataSource_Report.xls"
+dataSourceXLS = splitPath[0] + "\\" + splitPath[1][:-4] + "_MXD_DataSource_Report." + reportFormat
 df = arcpy.mapping.ListDataFrames(mxd)[0]
 lyrList = arcpy.mapping.ListLayers(df)
-book = xlwt.Workbook()
-sheet = book.add_sheet("Data Sources")
+dataSources = [lyr.dataSource for lyr in lyrList if lyr.supports("DATASOURCE")]
+status = None
+if checkSources:
+    status = check_sources(dataSources, list_workspace=list_workspace_arcpy, report=arcpy.AddMessage)
+    header = header + [STATUS_HEADER]
+book = open_report(dataSourceXLS, reportFormat)
+sheet = book.add_sheet("Data Sources", header)
 
 
 # Main
-sheet.write(0, 0, header[0])
-sheet.write(0, 1, header[1])
-sheet.write(0, 2, header[2])
-sheet.write(0, 3, header[3])
-
+rows = []
 for lyr in lyrList:
     if lyr.supports("DATASOURCE"):
         dSource = os.path.split(lyr.dataSource)
         rowNo += 1
-        sheet.write(rowNo, 0, rowNo)
-        sheet.write(rowNo, 1, lyr.name)
-        sheet.write(rowNo, 2, dSource[1])
-        sheet.write(rowNo, 3, dSource[0])
-book.save(dataSourceXLS)
+        row = [rowNo, lyr.name, dSource[1], dSource[0]]
+        if status is not None:
+            row.append(status.get(source_key("", lyr.dataSource), ""))
+        rows.append(row)
+sheet.write_rows(rows)
+book.close()
 os.startfile(dataSourceXLS)
 
 # Final status output
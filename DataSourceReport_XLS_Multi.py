@@ -4,79 +4,72 @@
 # DataSourceReport_XLS_Multi.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 17/07/2015
-# Last updated 31/07/2015
+# Last updated 18/10/2026
 # Description: Opens an *.xls workbooklisting the data source for each mxd in
-# in a separate tab.
+# in a separate tab. Mxds in subdirectories are included. Optional second
+# parameter sets the number of processes used to open the mxds (run the tool
+# out of process). Layers read from each mxd are cached in
+# MXD_DataSource_Inventory.sqlite so reruns only open new or changed mxds.
+# Optional third parameter picks the report format: xls (default), xlsx
+# (written as it goes, for large reports) or csv (a folder with one *.csv per
+# mxd).
+# Optional fourth parameter checks every unique data source once, in parallel,
+# and adds a STATUS column (OK, MISSING or UNREACHABLE).
 # NOTE: Only show layers from the top-most dataframe listed in the mxd Table of Contents.
 #
 #---------------------------------------------------------------------------
 
 # Import modules
 # from __future__ import print_function
-import os, arcpy, time, xlwt
+import os, arcpy, time
+from datasourcelib import check_sources, crawl, layer_sources, list_workspace_arcpy, open_inventory, write_sheets_report
+from poolutils import parse_processes
+from reportwriters import parse_format, report_path
 
-# User-supplied parameters
-mxdDir = arcpy.GetParameterAsText(0)
+if __name__ == '__main__':
 
-# Local variables
-mxds = [m for m in os.listdir(mxdDir) if m.endswith(".mxd")]
-header = ["TOC_NO", "LAYER_NAME", "FEATURE_CLASS", "DATA_SOURCE"]
-dataSourceXLS = mxdDir + "\\Multiple_MXD_DataSource_Report.xls"
-book = xlwt.Workbook()
+    # User-supplied parameters
+    mxdDir = arcpy.GetParameterAsText(0)
+    processes = parse_processes(arcpy.GetParameterAsText(1)) # Optional. Blank = 1, 0 = one per core
+    reportFormat = parse_format(arcpy.GetParameterAsText(2)) # Optional. xls (default), xlsx or csv
+    checkSources = arcpy.GetParameterAsText(3).lower() == "true" # Optional. Add a STATUS column
 
+    # Local variables
+    dataSourceXLS = report_path(mxdDir + "\\Multiple_MXD_DataSource_Report.xls", reportFormat)
 
 
-# Setup status output
-scriptName = 'DataSourceReport_XLS_Multi.py'
-StartTime = time.strftime("%#c", time.localtime())
-startText = "____________________Script started successfully.____________________"
-arcpy.AddMessage(" " * 3)
-arcpy.AddMessage("         -<>-<>-<>-" * 3)
-arcpy.AddMessage(" ")
-arcpy.AddMessage(startText)
-arcpy.AddMessage("\n")
-arcpy.AddMessage(StartTime)
+    # Setup status output
+    scriptName = 'DataSourceReport_XLS_Multi.py'
+    StartTime = time.strftime("%#c", time.localtime())
+    startText = "____________________Script started successfully.____________________"
+    arcpy.AddMessage(" " * 3)
+    arcpy.AddMessage("         -<>-<>-<>-" * 3)
+    arcpy.AddMessage(" ")
+    arcpy.AddMessage(startText)
+    arcpy.AddMessage("\n")
+    arcpy.AddMessage(StartTime)
 
 
-# Main
-
-for mx in mxds:
-    rowNo = 0
-    arcpy.AddMessage(mx)
-    lenMxdName = len(mx)
-    if lenMxdName > 34:
-        mxdName = mx[:30]
+    # Main
+    inventory = open_inventory(mxdDir)
+    try:
+        results = crawl(mxdDir, processes=processes, report=arcpy.AddMessage, inventory=inventory)
+        status = None
+        if checkSources:
+            results = list(results)
+            status = check_sources(layer_sources(results), list_workspace=list_workspace_arcpy, report=arcpy.AddMessage)
+        write_sheets_report(dataSourceXLS, results, reportFormat, status)
+    finally:
+        inventory.close()
+    if reportFormat == "csv":
+        os.startfile(os.path.splitext(dataSourceXLS)[0])
     else:
-        mxdName = mx[:-4]
-    nextMxd = mxdDir + "\\" + mx
-    mxd = arcpy.mapping.MapDocument(nextMxd)
-    df = arcpy.mapping.ListDataFrames(mxd)[0]
-    lyrList = arcpy.mapping.ListLayers(df)
-    sheet = book.add_sheet(mxdName)
-    sheet.write(0, 0, header[0])
-    sheet.write(0, 1, header[1])
-    sheet.write(0, 2, header[2])
-    sheet.write(0, 3, header[3])
-    for lyr in lyrList:
-        rowNo += 1
-        if lyr.supports("DATASOURCE"):
-            dSource = os.path.split(lyr.dataSource)
-            sheet.write(rowNo, 0, rowNo)
-            sheet.write(rowNo, 1, lyr.name)
-            sheet.write(rowNo, 2, dSource[1])
-            sheet.write(rowNo, 3, dSource[0])
-        elif lyr.isGroupLayer:
-            sheet.write(rowNo, 0, rowNo)
-            sheet.write(rowNo, 1, lyr.name)
-            sheet.write(rowNo, 2, "Group Layer")
-
-book.save(dataSourceXLS)
-os.startfile(dataSourceXLS)
+        os.startfile(dataSourceXLS)
 
-# Final status output
-arcpy.AddMessage("\nStarted  " + scriptName)
-arcpy.AddMessage(StartTime)
-arcpy.AddMessage("\nFinished " + scriptName)
-finishTime = time.strftime("%#c", time.localtime())
-arcpy.AddMessage(finishTime)
-arcpy.AddMessage("\n=====================================================================")
+    # Final status output
+    arcpy.AddMessage("\nStarted  " + scriptName)
+    arcpy.AddMessage(StartTime)
+    arcpy.AddMessage("\nFinished " + scriptName)
+    finishTime = time.strftime("%#c", time.localtime())
+    arcpy.AddMessage(finishTime)
+    arcpy.AddMessage("\n=====================================================================")
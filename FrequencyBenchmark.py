@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+#---------------------------------------------------------------------------
+#
+# FrequencyBenchmark.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Benchmark of the row by row count_values() loop against the
+#              NumPy count_chunks() used by ListUniqueValues.py, on generated
+#              sensor reading data written to a csv file and a SQLite table.
+#              Checks that both produce identical counts before timing.
+#              Reading and counting are timed apart: csv and SQLite rows
+#              arrive as Python objects either way, whereas TableToNumPyArray
+#              fills the arrays without them, so the count times are the
+#              ones that carry over to ListUniqueValues.py.
+#              Needs NumPy but not arcpy.
+#              Run from the command line:
+#                  python FrequencyBenchmark.py [rows] [chunk rows]
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+from __future__ import print_function
+import csv, io, os, random, shutil, sqlite3, sys, tempfile, timeit
+from frequencylib import (CHUNK_ROWS, count_chunks, count_values, read_chunks_csv, read_chunks_sqlite,
+                          read_rows_csv, read_rows_sqlite)
+
+# Local variables
+rowCount = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+chunkRows = int(sys.argv[2]) if len(sys.argv) > 2 else CHUNK_ROWS
+fields = ["SENSOR", "STATUS", "READING"]
+suburbs = [u"SOUTHPORT", u"SURFERS PARADISE", u"ROBINA", u"BURLEIGH HEADS", u"COOLANGATTA", u"NERANG"]
+statuses = [u"OK", u"OK", u"OK", u"LOW", u"HIGH", u"FAULT", None]
+
+
+# Functions
+def sensor_rows(n):
+    rnd = random.Random(2026)
+    for i in range(n):
+        yield (u"{}-{:03d}".format(rnd.choice(suburbs), rnd.randint(1, 400)), rnd.choice(statuses),
+               rnd.randint(0, 20) if rnd.random() < 0.98 else None)
+
+
+def write_csv(path, rows):
+    if sys.version_info[0] == 2:
+        f = open(path, "wb")
+    else:
+        f = io.open(path, "w", encoding="utf-8", newline="")
+    with f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(["" if v is None else v for v in row])
+
+
+def write_sqlite(path, rows):
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE readings (SENSOR TEXT, STATUS TEXT, READING INTEGER)")
+    con.executemany("INSERT INTO readings VALUES (?, ?, ?)", rows)
+    con.commit()
+    con.close()
+
+
+def timed(func):
+    result = []
+    seconds = min(timeit.repeat(lambda: result.append(func()), number=1, repeat=3))
+    return seconds, result[-1]
+
+
+# Main
+tmpDir = tempfile.mkdtemp(prefix="frequency_")
+try:
+    rows = list(sensor_rows(rowCount))
+    csvPath = os.path.join(tmpDir, "readings.csv")
+    dbPath = os.path.join(tmpDir, "readings.sqlite")
+    write_csv(csvPath, rows)
+    write_sqlite(dbPath, rows)
+    del rows
+
+    print("{} rows, {} rows per chunk".format(rowCount, chunkRows))
+    for name, readRows, readChunks in (
+            ("csv", lambda: read_rows_csv(csvPath, fields), lambda: read_chunks_csv(csvPath, fields, chunkRows)),
+            ("sqlite", lambda: read_rows_sqlite(dbPath, "readings", fields),
+             lambda: read_chunks_sqlite(dbPath, "readings", fields, chunkRows))):
+        readTime, rows = timed(lambda: list(readRows()))
+        chunkReadTime, chunks = timed(lambda: list(readChunks()))
+        print("{:6} read       rows {:7.3f} s  chunks {:7.3f} s".format(name, readTime, chunkReadTime))
+        for label, n in (("3 fields", 3), ("2 fields", 2), ("1 field ", 1)):
+            loopTime, loopCounts = timed(lambda: count_values(row[:n] for row in rows))
+            chunkTime, chunkCounts = timed(lambda: count_chunks(columns[:n] for columns in chunks))
+            if loopCounts != chunkCounts:
+                raise ValueError("count_chunks() differs from count_values() for {} {}".format(name, label))
+            print("{:6} {}   loop {:7.3f} s  chunks {:7.3f} s  {:5.1f} x  ({} unique)".format(
+                name, label, loopTime, chunkTime, loopTime / chunkTime, len(loopCounts)))
+        del rows, chunks
+finally:
+    shutil.rmtree(tmpDir, ignore_errors=True)
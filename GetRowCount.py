@@ -4,68 +4,124 @@
 # GetRowCount.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 13/11/2015
-# Last updated 13/11/2015
+# Last updated 18/10/2026
 # Description: Produces a text file listing the number of rows for each feature class in the 
 #              current mxd. 
 #              Warns if a definition query may be limiting the number of records returned.
+#              Layers that share a data source and definition query are counted
+#              once, optionally in several processes (first parameter, started
+#              with pythonw.exe by poolutils as the tool reads the CURRENT mxd
+#              in process). Counts are cached in RowCount_cache.json beside
+#              the mxd and reused while the data source is unchanged.
+#              Shapefiles, dBASE tables, GeoPackages and SQLite tables are
+#              counted from their headers or metadata where these can be
+#              trusted, and by GetCount otherwise; each count says which.
+#              Each count is followed by the seconds it took. For a layer with
+#              a definition query the count is the rows it shows, and the
+#              total and hidden rows come from the same scan of the source.
+#              A layer that cannot be counted from its source, such as one
+#              with a definition query on the fields of a join, is counted
+#              with GetCount on the layer itself.
 #
 #---------------------------------------------------------------------------
 
 # Import modules
 from __future__ import print_function
 import os, arcpy, time
+from poolutils import parse_processes, save_json
+from rowcountlib import CACHE_NAME, count_rows, load_cache
 
+if __name__ == '__main__':
 
-# Local variables
-fName = "RowCount.txt"
+    # User-supplied parameters
+    processes = parse_processes(arcpy.GetParameterAsText(0)) # Optional. Blank = 1, 0 = one per core
 
+    # Local variables
+    fName = "RowCount.txt"
 
-# Setup status output
-scriptName = 'GetRowCount.py'
-StartTime = time.strftime("%#c", time.localtime())
-startText = "____________________Script started successfully.____________________"
-arcpy.AddMessage(" " * 3)
-arcpy.AddMessage("         -<>-<>-<>-" * 3)
-arcpy.AddMessage(" ")
-arcpy.AddMessage(startText)
-arcpy.AddMessage("\n")
-arcpy.AddMessage(StartTime)
 
+    # Setup status output
+    scriptName = 'GetRowCount.py'
+    StartTime = time.strftime("%#c", time.localtime())
+    startText = "____________________Script started successfully.____________________"
+    arcpy.AddMessage(" " * 3)
+    arcpy.AddMessage("         -<>-<>-<>-" * 3)
+    arcpy.AddMessage(" ")
+    arcpy.AddMessage(startText)
+    arcpy.AddMessage("\n")
+    arcpy.AddMessage(StartTime)
 
-# Setup
-mxd = arcpy.mapping.MapDocument("CURRENT") # create MapDocument object
-df = mxd.activeDataFrame                   # create DataFrame object 
-lyrList = arcpy.mapping.ListLayers(mxd, "", df)  # create list of layers
-splitPath = os.path.split(mxd.filePath)
-filePath = splitPath[0] + "\\" + fName
 
-# Main
-with open(filePath, 'w') as outFile:
+    # Setup
+    mxd = arcpy.mapping.MapDocument("CURRENT") # create MapDocument object
+    df = mxd.activeDataFrame                   # create DataFrame object 
+    lyrList = arcpy.mapping.ListLayers(mxd, "", df)  # create list of layers
+    splitPath = os.path.split(mxd.filePath)
+    filePath = splitPath[0] + "\\" + fName
+    cachePath = splitPath[0] + "\\" + CACHE_NAME
+
+    # Main
+    layers = []
+    layerObjects = []
     for lyr in lyrList:
         if lyr.supports("DATASOURCE"):
             desc = arcpy.Describe(lyr)
-            wc = desc.whereClause
-            arcpy.SelectLayerByAttribute_management(lyr, "CLEAR_SELECTION")
-            recs = str(arcpy.GetCount_management(lyr))
+            layers.append((lyr.name, lyr.dataSource, desc.whereClause))
+            layerObjects.append(lyr)
+
+    cache = load_cache(cachePath)
+    try:
+        counts = count_rows([(ds, wc) for name, ds, wc in layers], processes=processes, cache=cache,
+                            report=arcpy.AddMessage)
+    finally:
+        save_json(cachePath, cache)
+
+    # Layers that could not be counted from their data source, such as a
+    # definition query on the fields of a join, are counted through the layer
+    for i, (total, filtered, method, seconds, error) in enumerate(counts):
+        if error is None:
+            continue
+        name, ds, wc = layers[i]
+        t0 = time.time()
+        try:
+            shown = int(arcpy.GetCount_management(layerObjects[i]).getOutput(0))
+            if wc:
+                total = int(arcpy.GetCount_management(ds).getOutput(0))
+                counts[i] = (total, shown, "GetCount on the layer", time.time() - t0, None)
+            else:
+                counts[i] = (shown, None, "GetCount on the layer", time.time() - t0, None)
+            arcpy.AddMessage("{} rows in {} by GetCount on the layer".format(shown, name))
+        except Exception as e:
+            arcpy.AddMessage("Could not count {} through the layer either: {}".format(name, e))
+
+    with open(filePath, 'w') as outFile:
+        for (name, ds, wc), (total, filtered, method, seconds, error) in zip(layers, counts):
+            if error is not None:
+                recs = "Could not count: " + error
+            else:
+                timing = "cached" if seconds is None else "{:.3f} s".format(seconds)
+                recs = "{:<12}{:>10}   {}".format(total if filtered is None else filtered, timing, method)
             print('\n', sep=' ', end='\n', file=outFile)
-            calc = 50 - len(lyr.name)
+            calc = 50 - len(name)
             space = str(" "*calc)
-            print(lyr.name, recs, sep=space, end='\n', file=outFile)
+            print(name, recs, sep=space, end='\n', file=outFile)
             print('--------------------------------',  sep=' ', end='\n', file=outFile)
 
             if wc != "":
                 print("Note! This layer has a definition query!", sep=' ', end='\n', file=outFile)
                 print(wc, sep=' ', end='\n', file=outFile)
+                if error is None:
+                    print("{} of {} rows shown, {} hidden by the definition query".format(
+                        filtered, total, total - filtered), sep=' ', end='\n', file=outFile)
 
 
-os.startfile(filePath)
-
+    os.startfile(filePath)
 
-# Final status output
-arcpy.AddMessage("\nStarted  " + scriptName)
-arcpy.AddMessage(StartTime)
-arcpy.AddMessage("\nFinished " + scriptName)
-finishTime = time.strftime("%#c", time.localtime())
-arcpy.AddMessage(finishTime)
-arcpy.AddMessage("\n=====================================================================")
 
+    # Final status output
+    arcpy.AddMessage("\nStarted  " + scriptName)
+    arcpy.AddMessage(StartTime)
+    arcpy.AddMessage("\nFinished " + scriptName)
+    finishTime = time.strftime("%#c", time.localtime())
+    arcpy.AddMessage(finishTime)
+    arcpy.AddMessage("\n=====================================================================")
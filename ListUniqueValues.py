@@ -4,75 +4,129 @@
 # ListUniqueValues.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 02/01/2015
-# Last updated 02/01/2015
+# Last updated 18/10/2026
 # Description: Creates a list of unique values and frequency for a specified field.
 #              Opens a txt file "Frequency.txt" to display values
+#              Several fields (separated by ;) list each unique combination.
+#              The table is read once (see frequencylib). Optional parameters:
+#              sort by VALUE (default) or COUNT, keep only the top N most
+#              frequent, and also write the result to a *.csv, *.xls or
+#              *.xlsx file or a geodatabase table.
+#              Approximate error (e.g. 0.01 or 1%) counts in fixed memory for
+#              tables too big to hold every unique value: an estimate of the
+#              number of unique values and the most frequent ones, each count
+#              marked with how far it may be over.
+#              Exact counts of text and number fields are read a million rows
+#              at a time with TableToNumPyArray and counted with NumPy when it
+#              is available (see FrequencyBenchmark.py), and row by row
+#              otherwise.
+#              Processes above 1 split the table into ObjectID ranges that are
+#              counted in parallel and merged (run the tool out of process).
+#              A layer's definition query applies in every process; a layer
+#              with a selection is counted in one process.
+#              A pivot field turns the counts over several fields into a
+#              cross-tab with a column per value of that field, on a Pivot
+#              sheet of the output or in Pivot.csv beside Frequency.txt.
 #---------------------------------------------------------------------------
 
 # Import modules
 import os, arcpy, time
-
-# User-supplied parameters
-
-
-# Local variables
-table_ = arcpy.GetParameterAsText(0)
-field_ = arcpy.GetParameterAsText(1)
-frqDict = {}
-outFile = "C:/TEMP/Frequency.txt"
-outDir = "C:/TEMP" 
-
-# Setup status output
-scriptName = 'ListUniqueValues.py'
-StartTime = time.strftime("%#c", time.localtime())
-startText = "____________________Script started successfully.____________________"
-arcpy.AddMessage(" " * 3)
-arcpy.AddMessage("         -<>-<>-<>-" * 3)
-arcpy.AddMessage(" ")
-arcpy.AddMessage(startText)
-arcpy.AddMessage("\n")
-arcpy.AddMessage(StartTime)
-
-
-# Setup 
-if not os.path.exists(outDir):
-    os.makedirs(outDir)
-
-outF = open(outFile, "w")
-
-
-def unique_values(table, field):
-    with arcpy.da.SearchCursor(table, [field]) as cursor:
-        return sorted({row[0] for row in cursor})
-
-vals = unique_values(table_, field_)
-
-def frq_count(table, field, inputValue):
-    count = 0
-    with arcpy.da.SearchCursor(table, [field]) as cursor:
-        for row in cursor:
-            if row[0] == inputValue:
-                count += 1
-    return count
-
-for v in vals:
-    frqDict[v] = frq_count(table_, field_, v)
-
-# Main
-for e in vals:
-    outF.write(str(frqDict[e]) + "\t" + e + "\n")
-
-outF.close
-
-#Open resulting text file
-os.startfile(outFile)
-
-
-# Final status output
-arcpy.AddMessage("\nStarted  " + scriptName)
-arcpy.AddMessage(StartTime)
-arcpy.AddMessage("\nFinished " + scriptName)
-finishTime = time.strftime("%#c", time.localtime())
-arcpy.AddMessage(finishTime)
-arcpy.AddMessage("\n=====================================================================")
-
+from frequencylib import (count_chunks, count_partitioned, count_values, output_format, parse_error, partition_source,
+                          pivot_frequencies, read_chunks_arcpy, read_rows_arcpy, sketch_values, sort_frequencies,
+                          write_frequency_report, write_frequency_table, write_frequency_txt, write_pivot_report)
+from poolutils import parse_processes
+
+if __name__ == '__main__':
+
+    # User-supplied parameters
+    table_ = arcpy.GetParameterAsText(0)
+    fields_ = [f.strip() for f in arcpy.GetParameterAsText(1).split(";") if f.strip()]
+    sort_ = arcpy.GetParameterAsText(2).strip().lower() or "value" # Optional. VALUE or COUNT
+    top_ = arcpy.GetParameterAsText(3).strip() # Optional. Blank = all values
+    output_ = arcpy.GetParameterAsText(4).strip() # Optional. *.csv, *.xls, *.xlsx or a table
+    error_ = parse_error(arcpy.GetParameterAsText(5)) # Optional. Blank = exact counts
+    processes = parse_processes(arcpy.GetParameterAsText(6)) # Optional. Blank = 1, 0 = one per core
+    pivot_ = arcpy.GetParameterAsText(7).strip() # Optional. One of the fields
+
+
+    # Local variables
+    outFile = "C:/TEMP/Frequency.txt"
+    pivotFile = "C:/TEMP/Pivot.csv"
+    outDir = "C:/TEMP" 
+    top_ = int(top_) if top_ and top_ != "#" else None
+    pivot_ = pivot_ if pivot_ != "#" else ""
+
+    # Setup status output
+    scriptName = 'ListUniqueValues.py'
+    StartTime = time.strftime("%#c", time.localtime())
+    startText = "____________________Script started successfully.____________________"
+    arcpy.AddMessage(" " * 3)
+    arcpy.AddMessage("         -<>-<>-<>-" * 3)
+    arcpy.AddMessage(" ")
+    arcpy.AddMessage(startText)
+    arcpy.AddMessage("\n")
+    arcpy.AddMessage(StartTime)
+
+
+    # Setup 
+    if not os.path.exists(outDir):
+        os.makedirs(outDir)
+
+
+    # Main
+    note = None
+    if processes > 1:
+        try:
+            partition_source(table_)
+        except ValueError as e:
+            arcpy.AddMessage("Counting in one process ({})".format(e))
+            processes = 1
+    if processes > 1:
+        counts = count_partitioned(table_, fields_, processes, error=error_, report=arcpy.AddMessage)
+    elif error_:
+        counts = sketch_values(read_rows_arcpy(table_, fields_), error_, report=arcpy.AddMessage)
+    else:
+        try:
+            chunks = read_chunks_arcpy(table_, fields_)
+        except ValueError as e:
+            arcpy.AddMessage("Counting row by row ({})".format(e))
+            chunks = None
+        if chunks is not None:
+            counts = count_chunks(chunks, report=arcpy.AddMessage)
+        else:
+            counts = count_values(read_rows_arcpy(table_, fields_), report=arcpy.AddMessage)
+
+    if error_:
+        sketch = counts
+        items = sketch.top(top_, sort_)
+        note = "Approximate: about {} unique values in {} rows (+/- {:.1%}); counts may be over by up to {}".format(
+            sketch.distinct.estimate(), sketch.rows, error_, sketch.max_error())
+        arcpy.AddMessage(note)
+    else:
+        items = sort_frequencies(counts, sort_, top_)
+
+    pivot = pivot_frequencies(fields_, items, pivot_) if pivot_ else None
+
+    write_frequency_txt(outFile, items, note)
+    fmt = output_format(output_) if output_ and output_ != "#" else None
+    if output_ and output_ != "#":
+        if fmt:
+            write_frequency_report(output_, fields_, items, fmt, pivot)
+        else:
+            write_frequency_table(output_, table_, fields_, items)
+        arcpy.AddMessage("Frequencies written to " + output_)
+    if pivot is not None and not fmt:
+        write_pivot_report(pivotFile, pivot, "csv")
+        arcpy.AddMessage("Pivot written to " + pivotFile)
+
+    #Open resulting text file
+    os.startfile(outFile)
+
+
+    # Final status output
+    arcpy.AddMessage("\nStarted  " + scriptName)
+    arcpy.AddMessage(StartTime)
+    arcpy.AddMessage("\nFinished " + scriptName)
+    finishTime = time.strftime("%#c", time.localtime())
+    arcpy.AddMessage(finishTime)
+    arcpy.AddMessage("\n=====================================================================")
@@ -4,14 +4,27 @@
 # MoveUsingOtherFeatureGeometry.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 19/06/2016
-# Last updated 19/06/2016
+# Last updated 18/10/2026
 # Description: Replaces the geometry in a feature class (The "From" feature calls) with the geometry of a second feature class (The "To" feature class).
 # Requires 2 feature classes of the same geometry type with a common field with unique values. For example, where a value in the TREE_ID field in the "To" fc 
 # matches with a value in the TREE_ID field in the "From" fc, the geometry will be overwritten in the "From" fc.
+# The "To" geometries are held as WKB in a temporary disk-backed store (movelib.GeometryStore) rather than a dict
+# of geometry objects, so memory stays flat for millions of features or detailed polygons. WKB has no true curves,
+# so curved segments are densified.
+# The move is done in two phases. First the "From" fc is read to the end and features whose geometry already matches
+# the "To" geometry (x and y within the tolerance, by default the XY tolerance of the "From" fc, and z and m equal) are
+# left out; the ObjectIDs of those that differ go to a file beside the store. Then only those are written, in batched
+# edit operations with progress and a map refresh every few seconds, so no cursor is reading while edits are made. A
+# dry run stops after the first phase and reports how many features would move.
+# When both feature classes have a million or more features and are indexed on the common field in a geodatabase,
+# the comparison reads both in key order and merges them (a sort-merge join) instead of storing every "To" geometry;
+# duplicate and unmatched keys on either side are reported. The join can also be set to HASH or MERGE, and a merge
+# falls back to the hash join if the database does not return the keys in order.
 #---------------------------------------------------------------------------
 
 # Import modules
 import os, arcpy, time
+from movelib import MergeOrderError, apply_changes, build_geometry_store, choose_join, find_changes, merge_changes
 
 
 # User-supplied parameters
@@ -19,10 +32,16 @@ fromFC = arcpy.GetParameterAsText(0)
 toFC = arcpy.GetParameterAsText(1)
 fromField = arcpy.GetParameterAsText(2)
 toField = arcpy.GetParameterAsText(3)
+tolerance = arcpy.GetParameterAsText(4).strip() # Optional. Blank = XY tolerance of the "From" fc
+dryRun = arcpy.GetParameterAsText(5).lower() == "true" # Optional. Only report what would move
+join = arcpy.GetParameterAsText(6).strip() # Optional. AUTO (default), HASH or MERGE
 
 # Local variables
-geoDict = {}
 counter = 0
+spatialRef = arcpy.Describe(toFC).spatialReference
+fromSpatialRef = arcpy.Describe(fromFC).spatialReference
+tolerance = float(tolerance) if tolerance and tolerance != "#" else (fromSpatialRef.XYTolerance or 0.0)
+sameSpatialRef = spatialRef.exportToString() == fromSpatialRef.exportToString()
 
 # Environmental settings
 arcpy.env.workspace = os.path.split(fromFC)[0]
@@ -41,41 +60,48 @@ arcpy.AddMessage(StartTime)
 
 
 # Setup
-
-msg = "Creating a search cursor in the feature class '{}' to populate a dictionary with the values from the {} field as the key and the geometry object as the value".format(toFC, toField)
-arcpy.AddMessage(msg)
-with arcpy.da.SearchCursor(toFC, [toField, "SHAPE@"]) as cur: # Get common value and geometry object from the "To" feature class
-    for row in cur:
-        geoDict[row[0]] = row[1] # Add common value as key and geometry object as value to dictionary
-msg = "Dictionary created with {} values.".format(len(geoDict))
-arcpy.AddMessage(msg)
+join = choose_join(fromFC, fromField, toFC, toField, join if join != "#" else "auto", report=arcpy.AddMessage)
 
 
 # Main
-msg = "Starting the geometry update process... "
-arcpy.AddMessage(msg)
-msg = "Opening edit session... "
+msg = "Comparing the geometry of the features in '{}' with a tolerance of {}... ".format(fromFC, tolerance)
 arcpy.AddMessage(msg)
+if not sameSpatialRef:
+    arcpy.AddMessage("The feature classes have different spatial references, so every matching feature will be moved")
 
+geoStore = None
 try:
-
-    with arcpy.da.Editor(ws) as edit: 
-
-        with arcpy.da.UpdateCursor(fromFC, [fromField, "SHAPE@"]) as cur: # Iterate through rows
-            for row in cur:
-                if row[0] in geoDict: # Check if there is a matching value
-                    counter += 1
-                    row[1] = geoDict[row[0]] # Overwrite existing geometry with geometry from dictionary
-                    if counter % 10 == 0:
-                        # arcpy.RefreshActiveView()
-                        msg = str(counter) + " trees moved"
-                        # msg = "Geometry updated for {} {}".format(fromField, row[0])
-                        arcpy.AddMessage(msg)
-                    cur.updateRow(row)
-                    arcpy.RefreshActiveView()
+    if join == "merge":
+        msg = "Reading '{}' and '{}' in {} order to merge them".format(fromFC, toFC, fromField)
+        arcpy.AddMessage(msg)
+        try:
+            changes, counts, geoStore = merge_changes(fromFC, fromField, toFC, toField, tolerance,
+                                                      compare=sameSpatialRef, report=arcpy.AddMessage)
+        except MergeOrderError as e:
+            arcpy.AddMessage("{}, using a hash join instead".format(e))
+            join = "hash"
+    if join != "merge":
+        msg = "Creating a search cursor in the feature class '{}' to store the geometry of each feature by its {} value".format(toFC, toField)
+        arcpy.AddMessage(msg)
+        geoStore = build_geometry_store(toFC, toField, report=arcpy.AddMessage) # Common value as key and WKB as value
+        msg = "Geometry store created with {} values.".format(len(geoStore))
+        arcpy.AddMessage(msg)
+        changes, counts = find_changes(fromFC, fromField, geoStore, tolerance, compare=sameSpatialRef,
+                                       report=arcpy.AddMessage)
+    if dryRun:
+        msg = "Dry run: {} trees would move, {} already in place, {} with no match in '{}'".format(
+            counts["changed"], counts["unchanged"], counts["unmatched"], toFC)
+        arcpy.AddMessage(msg)
+    elif len(changes):
+        arcpy.AddMessage("Starting the geometry update process for {} trees... ".format(len(changes)))
+        counter = apply_changes(fromFC, ws, changes, geoStore, spatialRef, report=arcpy.AddMessage,
+                                refresh=arcpy.RefreshActiveView)
 except arcpy.ExecuteError:
     msg = arcpy.GetMessages(2)
     arcpy.AddMessage(msg)
+finally:
+    if geoStore is not None:
+        geoStore.close()
 
 arcpy.RefreshActiveView()
 msg = "Total of " + str(counter) + " trees moved"
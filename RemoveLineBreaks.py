@@ -4,17 +4,26 @@
 # RemoveLineBreaks.py
 # Mike Fleming mcfleming@goldcoast.qld.gov.au
 # Created: 19/06/2016
-# Last updated 19/06/2016
+# Last updated 18/10/2026
 # Description: Removes line breaks and excess spaces from the specified text field.
+#              Several fields can be cleaned in one pass of the table, each
+#              with its own list of transforms (see transformlib):
+#                  ADDRESS=collapse,chomp,truncate:50;SUBURB=trim,upper
+#              A field on its own gets the line break and space clean up.
+#              Only rows where a value changes are written.
 #
 #---------------------------------------------------------------------------
 
 # Import modules
 import arcpy, time
+from transformlib import apply_transforms, parse_transforms
 
 # User-supplied parameters
 feat_layer = arcpy.GetParameterAsText(0)
-fieldname = arcpy.GetParameterAsText(1)
+fieldname = arcpy.GetParameterAsText(1) # A field, or FIELD=transform,...;FIELD=...
+
+# Local variables
+transforms = parse_transforms(fieldname)
 
 # Setup status output
 scriptName = 'RemoveLineBreaks.py'
@@ -28,12 +37,14 @@ arcpy.AddMessage("\n")
 arcpy.AddMessage(StartTime)
 
 # Main
-with arcpy.da.UpdateCursor("feat_layer", fieldname) as cur:
-        for row in cur:
-            if row[0] != None:
-                noreturn = " ".join(row[0].split())
-                row[0] = noreturn 
-                cur.updateRow(row)
+for field, names, func in transforms:
+    arcpy.AddMessage("{}: {}".format(field, ", ".join(names)))
+
+with arcpy.da.UpdateCursor(feat_layer, [field for field, names, func in transforms]) as cur:
+    scanned, changed, seconds = apply_transforms(cur, transforms, report=arcpy.AddMessage)
+
+arcpy.AddMessage("{} rows scanned, {} changed in {:.1f} s ({:.0f} rows/s)".format(
+    scanned, changed, seconds, scanned / max(seconds, 1e-6)))
 
 # Final status output
 arcpy.AddMessage("\nStarted  " + scriptName)
@@ -42,4 +53,3 @@ arcpy.AddMessage("\nFinished " + scriptName)
 finishTime = time.strftime("%#c", time.localtime())
 arcpy.AddMessage(finishTime)
 arcpy.AddMessage("\n=====================================================================")
-
@@ -0,0 +1,399 @@
+#
+#---------------------------------------------------------------------------
+#
+# chomplib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Text sanitizer used by Chomper.py. Removes all non ASCII
+#              characters (after folding accented characters to their ASCII
+#              base), the non-printing ASCII controls and specific symbols
+#              ( @ ` # $ % & ' * ^ ~), then collapses runs of whitespace.
+#              Has no arcpy dependency so it can be imported by worker
+#              processes and benchmarks.
+#              clean_csv() streams a file through the filter one row at a
+#              time. clean_csv_parallel() splits the file into byte ranges
+#              that end on record boundaries and cleans them in a process
+#              pool, writing the results back in the original order.
+#              Boundaries are found by tracking quote parity, which assumes
+#              the csv module's default dialect: any field containing a quote
+#              or newline is itself quoted (as written by csv.writer, Excel
+#              and FME).
+#              clean_csv_incremental() keeps a small JSON checkpoint next to
+#              the output (input byte offset, row count and a hash of the last
+#              cleaned record) so a rerun on an append-only input only cleans
+#              the new tail. Anything that no longer matches the checkpoint
+#              triggers a full rebuild.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import csv, hashlib, io, json, os, re, sys, time, unicodedata
+from poolutils import no_report, pool_results, save_json
+
+try:
+    unicode
+except NameError:  # Python 3
+    unicode = str
+    unichr = chr
+
+# Local variables
+PY2 = sys.version_info[0] == 2
+NARROW_BUILD = sys.maxunicode == 0xFFFF
+MAX_CELL_LENGTH = 50
+CHUNK_SIZE = 8 * 1024 * 1024   # bytes of input per parallel work item
+SCAN_BLOCK = 1024 * 1024       # read size used when looking for boundaries
+CHECKPOINT_SUFFIX = ".chomp.json"
+
+control_chars = u''.join(map(unichr, range(0, 32))) + u'\x7f'
+control_char_re = re.compile(u'[%s]' % re.escape(control_chars))
+symbol_chars = u'\x40\x60\x23\x24\x25\x26\x27\x2A\x5E\x7E'
+symbol_chars_re = re.compile(u'[%s]' % re.escape(symbol_chars))
+
+# Printable ASCII that survives the filter unchanged.
+keep_chars = u''.join(unichr(c) for c in range(0x20, 0x7f) if unichr(c) not in symbol_chars)
+
+# A cell is already clean if it holds nothing but kept characters, with no
+# leading, trailing or doubled spaces. Such cells are returned untouched.
+_dirty_pattern = r'[^%s]|^ | $|  '
+dirty_re = re.compile(_dirty_pattern % re.escape(keep_chars))
+if PY2:
+    dirty_bytes_re = re.compile(_dirty_pattern % re.escape(keep_chars.encode('ascii')))
+else:
+    dirty_bytes_re = re.compile((_dirty_pattern % re.escape(keep_chars)).encode('ascii'))
+
+surrogate_pair_re = re.compile(u'[\ud800-\udbff][\udc00-\udfff]') if NARROW_BUILD else None
+
+
+# Functions
+class FoldTable(dict):
+    """Per code point lookup table for unicode.translate().
+
+    ASCII entries are precomputed: kept characters map to themselves, controls
+    and symbols map to None (deleted). Non ASCII characters are folded with
+    NFKD the first time they are seen and the result is memoised in the table.
+    """
+
+    def __init__(self):
+        dict.__init__(self)
+        for c in range(0, 0x80):
+            ch = unichr(c)
+            self[c] = ch if ch in keep_chars else None
+
+    def __missing__(self, c):
+        folded = unicodedata.normalize('NFKD', unichr(c))
+        fold = u''.join(ch for ch in folded if ord(ch) < 0x80 and self[ord(ch)] is not None)
+        fold = fold or None
+        self[c] = fold
+        return fold
+
+
+fold_table = FoldTable()
+
+
+def _to_unicode(txt):
+    if isinstance(txt, unicode):
+        return txt
+    if isinstance(txt, bytes):
+        return txt.decode('utf-8')
+    return unicode(txt)
+
+
+def ChomperRegex(txt):
+    """The original multi-pass regex chain. Kept as the reference that
+    Chomper() must match, and as the baseline for ChomperBenchmark.py."""
+    utxt = _to_unicode(txt)
+    normalised = unicodedata.normalize('NFKD', utxt).encode('ascii', 'ignore')
+    if not PY2:
+        normalised = normalised.decode('ascii')
+    nocontrolchars = control_char_re.sub('', normalised)
+    nosymbol = symbol_chars_re.sub('', nocontrolchars)
+    stripped = " ".join(nosymbol.split())
+    return stripped
+
+
+def Chomper(txt):
+    """Sanitize one cell of text. Returns the same result as ChomperRegex()
+    in a single translate() pass."""
+    if isinstance(txt, bytes):
+        if dirty_bytes_re.search(txt) is None:
+            return txt if PY2 else txt.decode('ascii')
+        utxt = txt.decode('utf-8')
+    else:
+        utxt = _to_unicode(txt)
+        if dirty_re.search(utxt) is None:
+            return utxt.encode('ascii') if PY2 else utxt
+    if NARROW_BUILD and surrogate_pair_re.search(utxt):
+        # Astral characters arrive as two code units on narrow builds, so
+        # they cannot be folded one code point at a time.
+        return ChomperRegex(utxt)
+    folded = utxt.translate(fold_table)
+    if PY2:
+        folded = folded.encode('ascii')
+    return " ".join(folded.split())
+
+
+def ChompRow(row):
+    """Truncate and sanitize every cell in a csv row."""
+    return [Chomper(cell[:MAX_CELL_LENGTH]) for cell in row]
+
+
+def _open_csv_in(path):
+    if PY2:
+        return open(path, 'rb')
+    return io.open(path, 'r', encoding='utf-8', newline='')
+
+
+def _open_csv_out(path, mode='w'):
+    if PY2:
+        return open(path, mode + 'b')
+    return io.open(path, mode, encoding='utf-8', newline='')
+
+
+def clean_csv(in_path, out_path, report=no_report, every=100000):
+    """Clean a csv one row at a time so memory use stays flat regardless of
+    the size of the input. Returns the number of rows written."""
+    rowCount = 0
+    with _open_csv_in(in_path) as in_csv, _open_csv_out(out_path) as out_csv:
+        writer = csv.writer(out_csv)
+        for row in csv.reader(in_csv):
+            writer.writerow(ChompRow(row))
+            rowCount += 1
+            if rowCount % every == 0:
+                report("{} rows cleaned".format(rowCount))
+    return rowCount
+
+
+def find_chunks(path, chunk_size=CHUNK_SIZE):
+    """Split a csv into (start, end) byte ranges of roughly chunk_size bytes.
+    Each range ends just after a newline that is outside a quoted field, so
+    every range holds whole records."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    inQuotes = 0
+    target = chunk_size
+    blockStart = 0
+    with open(path, 'rb') as f:
+        while target < size:
+            block = f.read(SCAN_BLOCK)
+            if not block:
+                break
+            blockEnd = blockStart + len(block)
+            pos = 0
+            while True:
+                if target >= blockEnd:
+                    inQuotes ^= block.count(b'"', pos) & 1
+                    break
+                start = max(target - blockStart, pos)
+                inQuotes ^= block.count(b'"', pos, start) & 1
+                nl = block.find(b'\n', start)
+                if nl == -1:
+                    inQuotes ^= block.count(b'"', start) & 1
+                    target = blockEnd
+                    break
+                inQuotes ^= block.count(b'"', start, nl) & 1
+                pos = nl + 1
+                if inQuotes:
+                    # Newline inside a quoted field, keep looking
+                    target = blockStart + pos
+                    continue
+                bounds.append(blockStart + pos)
+                target = blockStart + pos + chunk_size
+            blockStart = blockEnd
+    if bounds[-1] != size:
+        bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def clean_chunk(task):
+    """Pool worker. Reads one byte range of the input and returns the cleaned
+    csv text for it as bytes, along with the number of rows."""
+    path, start, end = task
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    if PY2:
+        in_csv, out_csv = io.BytesIO(data), io.BytesIO()
+    else:
+        in_csv, out_csv = io.StringIO(data.decode('utf-8'), newline=''), io.StringIO(newline='')
+    writer = csv.writer(out_csv)
+    rowCount = 0
+    for row in csv.reader(in_csv):
+        writer.writerow(ChompRow(row))
+        rowCount += 1
+    out = out_csv.getvalue()
+    return (out if PY2 else out.encode('utf-8')), rowCount
+
+
+def clean_csv_parallel(in_path, out_path, processes, chunk_size=CHUNK_SIZE, report=no_report,
+                       chunks=None):
+    """Clean a csv across a pool of processes. The input is split into byte
+    ranges on record boundaries, each range is cleaned by a worker and the
+    results are written in the original order. Returns the number of rows."""
+    t0 = time.time()
+    if chunks is None:
+        chunks = find_chunks(in_path, chunk_size)
+    report("{} chunks of up to {} MB across {} processes".format(
+        len(chunks), chunk_size // (1024 * 1024), processes))
+    rowCount = 0
+    tasks = [(in_path, start, end) for start, end in chunks]
+    with pool_results(clean_chunk, tasks, processes, ordered=True) as results, open(out_path, 'wb') as out_csv:
+        for i, (data, rows) in enumerate(results, 1):
+            out_csv.write(data)
+            rowCount += rows
+            report("Chunk {} of {}: {} rows cleaned".format(i, len(chunks), rowCount))
+    elapsed = max(time.time() - t0, 1e-6)
+    report("{} rows in {:.1f} s ({:.0f} rows/s)".format(rowCount, elapsed, rowCount / elapsed))
+    return rowCount
+
+
+def read_records(f):
+    """Yield (row, raw) for each csv record in a file opened in binary mode,
+    where raw is the record's bytes exactly as they appear in the file."""
+    pending = []
+
+    def lines():
+        for line in f:
+            pending.append(line)
+            yield line if PY2 else line.decode('utf-8')
+
+    for row in csv.reader(lines()):
+        raw = b''.join(pending)
+        del pending[:]
+        yield row, raw
+
+
+def _csv_bytes(row):
+    if PY2:
+        buf = io.BytesIO()
+        csv.writer(buf).writerow(row)
+        return buf.getvalue()
+    buf = io.StringIO(newline='')
+    csv.writer(buf).writerow(row)
+    return buf.getvalue().encode('utf-8')
+
+
+def _sha1(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def checkpoint_matches(in_path, out_path, checkpoint):
+    """True if the input still starts with everything recorded in the
+    checkpoint and the output still holds what was written for it."""
+    try:
+        offset = int(checkpoint['offset'])
+        length = int(checkpoint['last_record_length'])
+        if offset <= 0 or length <= 0 or length > offset:
+            return False
+        if os.path.getsize(in_path) < offset:
+            return False
+        if os.path.getsize(out_path) < int(checkpoint['output_size']):
+            return False
+        with open(in_path, 'rb') as f:
+            f.seek(offset - length)
+            return _sha1(f.read(length)) == checkpoint['last_record_sha1']
+    except (KeyError, TypeError, ValueError, OSError, IOError):
+        return False
+
+
+def _append_records(in_path, out_path, checkpoint, report, every):
+    """Clean the input from checkpoint['offset'] onwards and write it to the
+    output from checkpoint['output_size'] onwards. Returns the number of rows
+    written and the updated checkpoint.
+
+    Only records that end with a newline move the checkpoint forward. A final
+    record without one may still be half written by whatever appends to the
+    input, so it is cleaned and written but redone on the next run."""
+    checkpoint = dict(checkpoint)
+    newRows = 0
+    mode = 'r+b' if checkpoint['output_size'] else 'wb'
+    with open(in_path, 'rb') as fin, open(out_path, mode) as raw:
+        raw.seek(checkpoint['output_size'])
+        raw.truncate()
+        out = raw if PY2 else io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        writer = csv.writer(out)
+        fin.seek(checkpoint['offset'])
+        for row, rec in read_records(fin):
+            if not rec.endswith(b'\n'):
+                out.flush()
+                checkpoint['output_size'] = raw.tell()
+                writer.writerow(ChompRow(row))
+                newRows += 1
+                out.flush()
+                break
+            writer.writerow(ChompRow(row))
+            newRows += 1
+            checkpoint['offset'] += len(rec)
+            checkpoint['rows'] += 1
+            checkpoint['last_record_length'] = len(rec)
+            checkpoint['last_record_sha1'] = _sha1(rec)
+            if newRows % every == 0:
+                report("{} rows cleaned".format(newRows))
+        else:
+            out.flush()
+            checkpoint['output_size'] = raw.tell()
+        if not PY2:
+            out.detach()
+    return newRows, checkpoint
+
+
+def _checkpoint_from_tail(in_path, out_path, start, rows):
+    """Build a checkpoint after a parallel rebuild by reading the records
+    from the start of the last chunk to the end of the input."""
+    checkpoint = {'offset': start, 'rows': rows, 'last_record_length': 0,
+                  'last_record_sha1': None, 'output_size': os.path.getsize(out_path)}
+    tailRows = []
+    with open(in_path, 'rb') as f:
+        f.seek(start)
+        for row, rec in read_records(f):
+            tailRows.append(len(rec))
+            if rec.endswith(b'\n'):
+                checkpoint['offset'] += len(rec)
+                checkpoint['last_record_length'] = len(rec)
+                checkpoint['last_record_sha1'] = _sha1(rec)
+            else:
+                checkpoint['rows'] -= 1
+                checkpoint['output_size'] -= len(_csv_bytes(ChompRow(row)))
+    return checkpoint
+
+
+def clean_csv_incremental(in_path, out_path, processes=1, checkpoint_path=None,
+                          report=no_report, every=100000):
+    """Clean only the part of an append-only csv that has been added since
+    the last run, appending it to the existing output. Falls back to a full
+    rebuild when there is no usable checkpoint or it no longer matches the
+    input or output. Returns (rows cleaned this run, total rows in output)."""
+    if checkpoint_path is None:
+        checkpoint_path = out_path + CHECKPOINT_SUFFIX
+    checkpoint = load_checkpoint(checkpoint_path)
+    if checkpoint and os.path.exists(out_path) and checkpoint_matches(in_path, out_path, checkpoint):
+        report("Checkpoint found, resuming at byte {} after {} rows".format(
+            checkpoint['offset'], checkpoint['rows']))
+    else:
+        if checkpoint:
+            report("Checkpoint does not match the input or output, rebuilding")
+        else:
+            report("No checkpoint found, cleaning the whole file")
+        checkpoint = {'offset': 0, 'rows': 0, 'last_record_length': 0,
+                      'last_record_sha1': None, 'output_size': 0}
+        if processes > 1 and os.path.getsize(in_path) > 0:
+            chunks = find_chunks(in_path)
+            rowCount = clean_csv_parallel(in_path, out_path, processes, report=report, chunks=chunks)
+            checkpoint = _checkpoint_from_tail(in_path, out_path, chunks[-1][0], rowCount)
+            checkpoint['input'] = os.path.basename(in_path)
+            save_json(checkpoint_path, checkpoint)
+            return rowCount, rowCount
+    newRows, checkpoint = _append_records(in_path, out_path, checkpoint, report, every)
+    checkpoint['input'] = os.path.basename(in_path)
+    save_json(checkpoint_path, checkpoint)
+    # An unterminated final record is in the output but not the checkpoint
+    totalRows = checkpoint['rows'] + (os.path.getsize(out_path) > checkpoint['output_size'])
+    return newRows, totalRows
@@ -0,0 +1,321 @@
+#
+#---------------------------------------------------------------------------
+#
+# croplib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Crops exported map sheets for CropJPEG.py. Has no arcpy
+#              dependency so the crop work can be spread across a process
+#              pool. Output files keep the Sheet_NN.jpg numbering given by
+#              the position of each file in the sorted directory listing.
+#              Several named regions can be cut from each sheet; the source
+#              is decoded once and every region is cropped from that image.
+#              Lossless mode snaps the crop box out to the JPEG's MCU block
+#              grid and uses jpegtran to copy the compressed blocks straight
+#              into the output without decoding or re-encoding them. Sheets
+#              that cannot be done that way fall back to the decode path.
+#              jpegtran is found on the PATH or through the JPEGTRAN
+#              environment variable.
+#              A manifest in the jpeg directory records a content hash of each
+#              source, its crop boxes and a hash of each output, so sheets
+#              whose source and boxes have not changed are skipped on a rerun.
+#              detect_frame_box() finds the map frame border on a sample sheet
+#              with NumPy row and column scans, so the crop box does not have
+#              to be measured by hand for each template and export DPI.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import json, os, re, struct, subprocess, time
+import numpy as np
+from PIL import Image
+from poolutils import file_sha1, no_report, pool_results, save_json
+
+
+# Local variables
+SOF_MARKERS = (0xC0, 0xC1, 0xC2)  # baseline, extended sequential, progressive
+MANIFEST_NAME = "CropJPEG_manifest.json"
+DARK_THRESHOLD = 128   # grey level below which a pixel counts as border ink
+FRAME_MIN_FILL = 0.5   # fraction of a row or column that must be dark
+SCAN_STEP = 8          # sample every nth pixel along each row or column
+
+
+# Functions
+def find_jpegtran():
+    """Return the path to jpegtran, or None if it is not installed."""
+    exe = os.environ.get("JPEGTRAN")
+    if exe and os.path.isfile(exe):
+        return exe
+    names = ["jpegtran"]
+    if os.name == "nt":
+        names = ["jpegtran.exe", "jpegtran"]
+    for folder in os.environ.get("PATH", "").split(os.pathsep):
+        for name in names:
+            candidate = os.path.join(folder.strip('"'), name)
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+def jpeg_info(path):
+    """Read the frame header of a JPEG without decoding it. Returns
+    (width, height, mcu_width, mcu_height), or None if the file is not a
+    JPEG that jpegtran can crop."""
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            return None
+        while True:
+            byte = f.read(1)
+            while byte and byte != b"\xff":
+                byte = f.read(1)
+            while byte == b"\xff":
+                byte = f.read(1)
+            if not byte:
+                return None
+            marker = ord(byte)
+            if marker == 0xD8 or 0xD0 <= marker <= 0xD7 or marker == 0x01:
+                continue
+            if marker in (0xD9, 0xDA):
+                return None
+            header = f.read(2)
+            if len(header) < 2:
+                return None
+            length = struct.unpack(">H", header)[0]
+            if marker in SOF_MARKERS:
+                data = f.read(length - 2)
+                height, width, ncomp = struct.unpack(">HHB", data[1:6])
+                hmax = vmax = 1
+                for c in range(ncomp):
+                    sampling = ord(data[7 + c * 3:8 + c * 3])
+                    hmax = max(hmax, sampling >> 4)
+                    vmax = max(vmax, sampling & 0x0F)
+                if ncomp == 1:
+                    hmax = vmax = 1
+                return width, height, 8 * hmax, 8 * vmax
+            if 0xC3 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                return None  # lossless, hierarchical or arithmetic coded
+            f.seek(length - 2, 1)
+
+
+def mcu_align_box(box, info):
+    """Snap the left and top of a crop box out to the MCU grid. The right and
+    bottom need no snapping as partial blocks are allowed at those edges.
+    Returns an integer (left, top, right, bottom) or None if the box does not
+    lie within the image."""
+    width, height, mcuW, mcuH = info
+    left, top, right, bottom = [int(round(v)) for v in box]
+    if left < 0 or top < 0 or right > width or bottom > height or right <= left or bottom <= top:
+        return None
+    return (left - left % mcuW, top - top % mcuH, right, bottom)
+
+
+def lossless_crop(src, dst, box, info, jpegtran):
+    """Crop with jpegtran. Returns the box used, or None if the source cannot
+    be cropped losslessly."""
+    aligned = mcu_align_box(box, info)
+    if aligned is None:
+        return None
+    left, top, right, bottom = aligned
+    crop = "{}x{}+{}+{}".format(right - left, bottom - top, left, top)
+    cmd = [jpegtran, "-copy", "all", "-crop", crop, "-outfile", dst, src]
+    if subprocess.call(cmd) != 0:
+        return None
+    return aligned
+
+
+def load_manifest(jpegDir):
+    try:
+        with open(os.path.join(jpegDir, MANIFEST_NAME), "r") as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        manifest = {}
+    manifest.setdefault("sources", {})
+    return manifest
+
+
+def save_manifest(jpegDir, manifest):
+    save_json(os.path.join(jpegDir, MANIFEST_NAME), manifest)
+
+
+def known_outputs(regions, manifest):
+    """Names of files this tool wrote, so they are not taken for sources:
+    every output in the manifest plus anything named like <region>_NN.jpg."""
+    names = set()
+    for entry in manifest["sources"].values():
+        names.update(entry["outputs"])
+    pattern = re.compile(r"^(?:{})_\d{{2,}}\.jpg$".format("|".join(re.escape(n) for n in dict(regions))))
+    return names, pattern
+
+
+def _unchanged(entry, sha1, crops, lossless, jpegDir):
+    if entry is None or entry["sha1"] != sha1 or entry["lossless"] != lossless:
+        return False
+    outputs = entry["outputs"]
+    if len(outputs) != len(crops):
+        return False
+    for dst, box in crops:
+        out = outputs.get(os.path.basename(dst))
+        if out is None or out["box"] != list(box):
+            return False
+        path = os.path.join(jpegDir, os.path.basename(dst))
+        if not os.path.exists(path) or file_sha1(path) != out["sha1"]:
+            return False
+    return True
+
+
+def plan_tasks(tasks, manifest):
+    """Hash every source and drop the tasks whose source, boxes and outputs
+    match the manifest. Entries for sources that have gone are dropped.
+    Returns (tasks to run, source hashes, skipped count)."""
+    todo = []
+    hashes = {}
+    current = set(os.path.basename(task[0]) for task in tasks)
+    for name in list(manifest["sources"]):
+        if name not in current:
+            del manifest["sources"][name]
+    for task in tasks:
+        src, crops, lossless = task
+        name = os.path.basename(src)
+        hashes[src] = file_sha1(src)
+        entry = manifest["sources"].get(name)
+        if not _unchanged(entry, hashes[src], crops, lossless, os.path.dirname(src)):
+            todo.append(task)
+    return todo, hashes, len(tasks) - len(todo)
+
+
+def frame_box(grey, threshold=DARK_THRESHOLD, min_fill=FRAME_MIN_FILL, step=SCAN_STEP):
+    """Find the outer edges of the map frame in a 2D array of grey levels.
+    A row or column belongs to the frame border if at least min_fill of it is
+    darker than threshold. Every row and column is tested, but only every
+    step-th pixel along each one is sampled. Returns (left, top, right,
+    bottom) or None."""
+    alongRows = grey[:, ::step] < threshold
+    alongCols = grey[::step, :] < threshold
+    rows = np.flatnonzero(alongRows.sum(axis=1) >= min_fill * alongRows.shape[1])
+    cols = np.flatnonzero(alongCols.sum(axis=0) >= min_fill * alongCols.shape[0])
+    if rows.size < 2 or cols.size < 2:
+        return None
+    return (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+
+
+def detect_frame_box(path, threshold=DARK_THRESHOLD, min_fill=FRAME_MIN_FILL, step=SCAN_STEP):
+    """Detect the map frame crop box on a sample sheet. Returns the box and
+    the seconds spent scanning (excluding the decode), or (None, seconds)."""
+    grey = np.asarray(Image.open(path).convert("L"))
+    t0 = time.time()
+    box = frame_box(grey, threshold, min_fill, step)
+    return box, time.time() - t0
+
+
+def output_name(prefix, counter):
+    fnum = str(counter)
+    if len(fnum) < 2:
+        fnum = "0{}".format(fnum)
+    return "{}_{}.jpg".format(prefix, fnum)
+
+
+def parse_regions(text):
+    """Parse extra named crop regions from a script tool parameter written as
+    name=left,top,right,bottom;name=left,top,right,bottom
+    Returns a list of (name, box) tuples."""
+    regions = []
+    for entry in text.split(";"):
+        if not entry.strip():
+            continue
+        name, sep, extents = entry.partition("=")
+        name = name.strip()
+        try:
+            box = tuple(float(v) for v in extents.split(","))
+        except ValueError:
+            box = ()
+        if not sep or not name or len(box) != 4:
+            raise ValueError("Bad crop region '{}', expected name=left,top,right,bottom".format(entry))
+        regions.append((name, box))
+    return regions
+
+
+def sheet_tasks(jpegDir, regions, lossless=False, manifest=None):
+    """List the crop jobs for a directory, one per source jpg. Each job is
+    (source, [(output, box), ...], lossless) with one output per named region,
+    saved as <name>_NN.jpg. The counter advances for every directory entry,
+    jpg or not, to match the numbering CropJPEG.py has always used. With a
+    manifest, files written by earlier runs are left out of the listing."""
+    jpgs = os.listdir(jpegDir)
+    if manifest is not None:
+        names, pattern = known_outputs(regions, manifest)
+        jpgs = [j for j in jpgs if j not in names and not pattern.match(j)
+                and not j.startswith(MANIFEST_NAME)]
+    jpgs.sort()
+    tasks = []
+    for counter, j in enumerate(jpgs, 1):
+        if j.endswith(".jpg"):
+            crops = [(os.path.join(jpegDir, output_name(name, counter)), box) for name, box in regions]
+            tasks.append((os.path.join(jpegDir, j), crops, lossless))
+    return tasks
+
+
+def crop_sheet(task):
+    """Cut every region from one sheet. Regions are cropped losslessly if
+    asked for and possible; the rest are cut from a single decode of the
+    source. Returns the source path, the output paths, the seconds taken, the
+    number of source pixels and a count of regions done by each method."""
+    src, crops, lossless = task
+    t0 = time.time()
+    methods = {"lossless": 0, "decode": 0}
+    pixels = 0
+    pending = crops
+    if lossless:
+        jpegtran = find_jpegtran()
+        info = jpeg_info(src) if jpegtran else None
+        if info:
+            pixels = info[0] * info[1]
+            pending = [(dst, box) for dst, box in crops if not lossless_crop(src, dst, box, info, jpegtran)]
+            methods["lossless"] = len(crops) - len(pending)
+    if pending:
+        jpg = Image.open(src)
+        jpg.load()
+        pixels = jpg.size[0] * jpg.size[1]
+        for dst, box in pending:
+            jpg.crop(box).save(dst, "JPEG")
+        methods["decode"] = len(pending)
+    outputs = [(dst, file_sha1(dst)) for dst, box in crops]
+    return src, outputs, time.time() - t0, pixels, methods
+
+
+def crop_sheets(tasks, processes=1, report=no_report, manifest=None):
+    """Crop every task, in a process pool when processes > 1. Reports each
+    sheet as it finishes and the overall throughput at the end. With a
+    manifest, unchanged sheets are skipped and the manifest is updated with
+    what was written. Returns the number of sheets cropped."""
+    t0 = time.time()
+    if manifest is not None:
+        tasks, hashes, skipped = plan_tasks(tasks, manifest)
+        report("{} unchanged sheets skipped, {} to crop".format(skipped, len(tasks)))
+        boxes = dict((task[0], (task[1], task[2])) for task in tasks)
+    total = len(tasks)
+    pixels = 0
+    done = 0
+    methods = {"lossless": 0, "decode": 0}
+    with pool_results(crop_sheet, tasks, processes) as results:
+        for src, outputs, seconds, px, counts in results:
+            done += 1
+            pixels += px
+            for method in counts:
+                methods[method] += counts[method]
+            report("{} -> {} ({} of {}, {:.2f} s)".format(
+                os.path.basename(src), ", ".join(os.path.basename(o) for o, sha1 in outputs),
+                done, total, seconds))
+            if manifest is not None:
+                crops, lossless = boxes[src]
+                outputHashes = dict(outputs)
+                manifest["sources"][os.path.basename(src)] = {
+                    "sha1": hashes[src], "lossless": lossless,
+                    "outputs": dict((os.path.basename(dst), {"box": list(box), "sha1": outputHashes[dst]})
+                                    for dst, box in crops)}
+    elapsed = max(time.time() - t0, 1e-6)
+    report("\n{} sheets in {:.1f} s ({:.2f} sheets/s, {:.1f} megapixels/s)".format(
+        done, elapsed, done / elapsed, pixels / elapsed / 1e6))
+    if methods["lossless"]:
+        report("{} regions cropped losslessly, {} decoded".format(methods["lossless"], methods["decode"]))
+    return done
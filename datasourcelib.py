@@ -0,0 +1,612 @@
+#
+#---------------------------------------------------------------------------
+#
+# datasourcelib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Crawler and report writers shared by the DataSourceReport
+#              scripts. Walks a directory tree for map documents, reads the
+#              layers in the top-most dataframe of each one in a process pool
+#              and writes the TXT, per-sheet and single-table reports. The
+#              spreadsheet reports can be xls, xlsx or csv (see reportwriters).
+#
+#              The map document reader is pluggable. "arcpy" opens *.mxd
+#              files with arcpy.mapping. "json" reads *.json stand-ins so the
+#              crawler can be tested and benchmarked without arcpy:
+#                  {"layers": [{"name": "Roads",
+#                               "dataSource": "C:\\Data\\Base.gdb\\Roads"},
+#                              {"name": "Basemap", "isGroupLayer": true}]}
+#              A layer with a dataSource is treated as supporting DATASOURCE.
+#
+#              Each layer record is (TOC_NO, LAYER_NAME, FEATURE_CLASS,
+#              DATA_SOURCE, KIND) where KIND is one of the constants below.
+#
+#              An Inventory is a SQLite cache of those records keyed by the
+#              document's relative path, modified time, size and SHA-1. With
+#              one, the crawler only opens new or changed documents; a
+#              document whose time or size changed but whose hash did not is
+#              served from the cache too.
+#
+#              The inventory also indexes each layer by the normalized full
+#              path of its data source (see source_key), so it answers the
+#              reverse question - which maps use this feature class - with
+#              exact, folder/workspace prefix or wildcard lookups.
+#
+#              check_sources tests whether the data sources still exist. Each
+#              unique source is checked once per run, the share or drive it
+#              is on is probed first with a timeout, and the workspace
+#              (geodatabase, sde connection) or folder holding it is listed
+#              once for all of its feature classes. Threads that hang on a
+#              dead share are left behind and replaced. Workspaces are listed
+#              with arcpy in the calling thread, with no timeout.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+from __future__ import print_function
+import json, ntpath, os, re, sqlite3, threading, time
+from multiprocessing.pool import ThreadPool
+from poolutils import file_sha1, no_report, path_part_re, pool_results
+from reportwriters import open_report
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+# Local variables
+DATASOURCE = "DATASOURCE"
+GROUP = "GROUP"
+OTHER = "OTHER"
+TXT_SPACE = 50
+TXT_LINE = "---------------------------------------------------------------------------------------"
+SHEET_HEADER = ["TOC_NO", "LAYER_NAME", "FEATURE_CLASS", "DATA_SOURCE"]
+TABLE_HEADER = ["MXD", "TOC_NO", "LAYER_NAME", "FEATURE_CLASS", "DATA_SOURCE"]
+STATUS_HEADER = "STATUS"
+INVENTORY_NAME = "MXD_DataSource_Inventory.sqlite"
+INVENTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS layers (
+    path TEXT NOT NULL,
+    toc_no INTEGER NOT NULL,
+    layer_name TEXT,
+    feature_class TEXT,
+    data_source TEXT,
+    kind TEXT NOT NULL,
+    source_key TEXT
+);
+CREATE INDEX IF NOT EXISTS layers_path ON layers (path, toc_no);
+CREATE INDEX IF NOT EXISTS layers_source ON layers (source_key);
+"""
+LOOKUP_MODES = ("exact", "prefix", "glob")
+STATUS_OK = "OK"
+STATUS_MISSING = "MISSING"
+STATUS_UNREACHABLE = "UNREACHABLE"
+WORKSPACE_EXTS = (".gdb", ".mdb", ".sde")
+CHECK_THREADS = 16
+SHARE_TIMEOUT = 10
+GLOB_CHARS = "*?["
+multi_sep_re = re.compile(r"\\+")
+
+try:
+    unichr
+except NameError:  # Python 3
+    unichr = chr
+
+
+# Functions
+def _layer_record(tocNo, name, dataSource, isGroupLayer):
+    if dataSource is not None:
+        folder, fc = ntpath.split(dataSource)
+        return (tocNo, name, fc, folder, DATASOURCE)
+    if isGroupLayer:
+        return (tocNo, name, "Group Layer", "", GROUP)
+    return (tocNo, name, "", "", OTHER)
+
+
+def source_key(folder, fc):
+    """Key a data source is indexed under: the full path to the feature class
+    in lower case, with backslash separators and no doubled or trailing
+    separators, so C:/Data//Base.gdb/Roads and c:\\data\\base.gdb\\ROADS match."""
+    path = ntpath.join(folder, fc) if folder else fc
+    path = path.replace("/", "\\")
+    unc = path.startswith("\\\\")
+    path = multi_sep_re.sub(r"\\", path).rstrip("\\")
+    return ("\\" + path if unc else path).lower()
+
+
+def _next_key(key):
+    """Smallest string greater than every string that starts with key."""
+    return key[:-1] + unichr(ord(key[-1]) + 1)
+
+
+def read_mxd_arcpy(path):
+    """Layer records for the top-most dataframe of an mxd."""
+    import arcpy
+    mxd = arcpy.mapping.MapDocument(path)
+    try:
+        df = arcpy.mapping.ListDataFrames(mxd)[0]
+        records = []
+        for tocNo, lyr in enumerate(arcpy.mapping.ListLayers(df), 1):
+            dataSource = lyr.dataSource if lyr.supports("DATASOURCE") else None
+            records.append(_layer_record(tocNo, lyr.name, dataSource, lyr.isGroupLayer))
+        return records
+    finally:
+        del mxd
+
+
+def read_mxd_json(path):
+    """Layer records from a JSON stand-in for an mxd."""
+    with open(path, "r") as f:
+        doc = json.load(f)
+    return [_layer_record(tocNo, lyr["name"], lyr.get("dataSource"), lyr.get("isGroupLayer", False))
+            for tocNo, lyr in enumerate(doc["layers"], 1)]
+
+
+READERS = {
+    "arcpy": (".mxd", read_mxd_arcpy),
+    "json": (".json", read_mxd_json),
+}
+
+
+def find_mxds(root, reader="arcpy", recursive=True):
+    """Relative paths of every map document under root, sorted."""
+    ext = READERS[reader][0]
+    found = []
+    for folder, dirs, files in os.walk(root):
+        dirs.sort()
+        for name in files:
+            if name.lower().endswith(ext):
+                found.append(os.path.relpath(os.path.join(folder, name), root))
+        if not recursive:
+            break
+    found.sort()
+    return found
+
+
+class Inventory(object):
+    """SQLite cache of the layer records read from each map document."""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(INVENTORY_SCHEMA)
+
+    def document(self, relPath):
+        """(mtime, size, sha1) the document was last read at, or None."""
+        return self.db.execute("SELECT mtime, size, sha1 FROM documents WHERE path = ?",
+                               (relPath,)).fetchone()
+
+    def layers(self, relPath):
+        return [tuple(row) for row in self.db.execute(
+            "SELECT toc_no, layer_name, feature_class, data_source, kind FROM layers "
+            "WHERE path = ? ORDER BY toc_no", (relPath,))]
+
+    def store(self, relPath, mtime, size, sha1, layers):
+        self.db.execute("DELETE FROM layers WHERE path = ?", (relPath,))
+        self.db.executemany("INSERT INTO layers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            [(relPath,) + tuple(layer) + (source_key(layer[3], layer[2]) if layer[4] == DATASOURCE
+                                                          else None,) for layer in layers])
+        self.db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                        (relPath, mtime, size, sha1))
+
+    def touch(self, relPath, mtime, size):
+        self.db.execute("UPDATE documents SET mtime = ?, size = ? WHERE path = ?",
+                        (mtime, size, relPath))
+
+    def prune(self, relPaths):
+        """Forget documents that are no longer in relPaths."""
+        keep = set(relPaths)
+        gone = [(p,) for (p,) in self.db.execute("SELECT path FROM documents") if p not in keep]
+        self.db.executemany("DELETE FROM layers WHERE path = ?", gone)
+        self.db.executemany("DELETE FROM documents WHERE path = ?", gone)
+        return len(gone)
+
+    def lookup(self, path, mode="exact"):
+        """Layers whose data source matches path, as (data source, document,
+        TOC_NO, layer name) sorted by data source then document.
+        exact  - the feature class itself.
+        prefix - the feature class, or anything in the folder, geodatabase or
+                 feature dataset path names.
+        glob   - a wildcard pattern (* ? [...]) over the whole data source
+                 path, e.g. *\\roads or \\\\server\\gis\\*.shp."""
+        if mode not in LOOKUP_MODES:
+            raise ValueError("Unknown lookup mode '{}', expected one of {}".format(mode, ", ".join(LOOKUP_MODES)))
+        select = "SELECT data_source, feature_class, path, toc_no, layer_name FROM layers WHERE "
+        order = " ORDER BY source_key, path, toc_no"
+        key = source_key("", path)
+        if mode == "exact":
+            rows = self.db.execute(select + "source_key = ?" + order, (key,))
+        elif mode == "prefix":
+            rows = self.db.execute(select + "(source_key = ? OR (source_key >= ? AND source_key < ?))" + order,
+                                   (key, key + "\\", _next_key(key + "\\")))
+        else:
+            # Bound the GLOB by its literal start so the index is used
+            literal = key
+            for ch in GLOB_CHARS:
+                literal = literal.split(ch)[0]
+            if literal:
+                rows = self.db.execute(select + "source_key >= ? AND source_key < ? AND source_key GLOB ?" + order,
+                                       (literal, _next_key(literal), key))
+            else:
+                rows = self.db.execute(select + "source_key GLOB ?" + order, (key,))
+        return [(ntpath.join(folder, fc) if folder else fc, relPath, tocNo, lname)
+                for folder, fc, relPath, tocNo, lname in rows]
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def open_inventory(root):
+    """The inventory kept in the top folder of a crawl."""
+    return Inventory(os.path.join(root, INVENTORY_NAME))
+
+
+def read_task(task):
+    """Pool worker. Returns (relative path, sha1, layer records, error).
+    With useHash the document is hashed first, and if the hash matches
+    knownSha1 it is not opened and layers is None."""
+    reader, root, relPath, useHash, knownSha1 = task
+    path = os.path.join(root, relPath)
+    try:
+        sha1 = file_sha1(path) if useHash else None
+        if sha1 is not None and sha1 == knownSha1:
+            return relPath, sha1, None, None
+        return relPath, sha1, READERS[reader][1](path), None
+    except Exception as e:
+        return relPath, None, [], "{}: {}".format(type(e).__name__, e)
+
+
+def crawl(root, reader="arcpy", processes=1, recursive=True, report=no_report, inventory=None):
+    """Yield (relative path, layer records) for every map document under root,
+    in sorted path order. Documents are opened in a process pool when
+    processes > 1. Documents that cannot be read are reported and skipped.
+    With an Inventory, only new or changed documents are opened and the rest
+    come from the cache, which is updated as the crawl goes."""
+    t0 = time.time()
+    mxds = find_mxds(root, reader, recursive)
+    report("{} map documents found under {}".format(len(mxds), root))
+    plan = []
+    tasks = []
+    for m in mxds:
+        st = os.stat(os.path.join(root, m))
+        known = inventory.document(m) if inventory else None
+        fresh = known is not None and known[0] == st.st_mtime and known[1] == st.st_size
+        plan.append((m, st, fresh))
+        if not fresh:
+            tasks.append((reader, root, m, inventory is not None, known[2] if known else None))
+    if inventory:
+        report("{} documents unchanged since the last run, {} to check".format(
+            len(mxds) - len(tasks), len(tasks)))
+    layerCount = 0
+    opened = 0
+    try:
+        with pool_results(read_task, tasks, processes, ordered=True) as results:
+            for relPath, st, fresh in plan:
+                if fresh:
+                    layers = inventory.layers(relPath)
+                else:
+                    relPath, sha1, layers, error = next(results)
+                    if error:
+                        report("Could not read {}: {}".format(relPath, error))
+                        continue
+                    if layers is None:
+                        layers = inventory.layers(relPath)
+                        inventory.touch(relPath, st.st_mtime, st.st_size)
+                    else:
+                        report("Now reading {}".format(relPath))
+                        opened += 1
+                        if inventory:
+                            inventory.store(relPath, st.st_mtime, st.st_size, sha1, layers)
+                            if opened % 100 == 0:
+                                inventory.commit()
+                layerCount += len(layers)
+                yield relPath, layers
+    finally:
+        if inventory:
+            inventory.commit()
+    if inventory:
+        inventory.prune(mxds)
+        inventory.commit()
+    elapsed = max(time.time() - t0, 1e-6)
+    report("{} layers from {} documents ({} opened) in {:.1f} s ({:.1f} documents/s)".format(
+        layerCount, len(mxds), opened, elapsed, len(mxds) / elapsed))
+
+
+def _source_parts(dataSource):
+    """(share or drive, container, is workspace) for a data source path. The
+    container is the geodatabase or sde connection file the source is in, or
+    else the folder holding it."""
+    share = ntpath.splitdrive(dataSource)[0]
+    for part in path_part_re.finditer(dataSource):
+        if part.group().lower().endswith(WORKSPACE_EXTS):
+            return share, dataSource[:part.end()], True
+    return share, ntpath.dirname(dataSource), False
+
+
+def list_workspace_arcpy(workspace):
+    """Source keys of everything in a geodatabase or sde connection, with
+    one arcpy.da.Walk (which connects to the database), or False if the
+    workspace does not exist."""
+    import arcpy
+    if not arcpy.Exists(workspace):
+        return False
+    found = set()
+    for dirpath, dirnames, filenames in arcpy.da.Walk(workspace):
+        found.update(source_key(dirpath, name) for name in dirnames + filenames)
+    return found
+
+
+def _list_folder(path):
+    # Lower case names in a folder, or False if it is not there
+    try:
+        return set(name.lower() for name in os.listdir(path))
+    except OSError:
+        return False
+
+
+def _list_workspace(path, list_workspace, report):
+    # False if a workspace is missing, True if it is there but was not
+    # listed, the source keys in it, or None if listing it failed
+    if list_workspace is None:
+        return os.path.isfile(path) if path.lower().endswith(".sde") else os.path.isdir(path)
+    t0 = time.time()
+    try:
+        found = list_workspace(path)
+    except Exception as e:
+        report("Could not list {}: {}".format(path, e))
+        return None
+    if found is not False:
+        report("{} listed in {:.1f} s".format(path, time.time() - t0))
+    return found
+
+
+def _run_checks(func, items, groupOf, threads, timeout, dead, report):
+    """{item: func(item)} with func run in up to threads daemon threads. An
+    item that takes more than timeout seconds adds its group (share) to dead
+    and is None. Its thread is left behind and another started in its place,
+    so a dead share cannot tie up the checks of the others, and the group's
+    other items are None without being run. An item whose check raises is
+    reported and None too."""
+    todo = list(reversed(items))
+    started = {}
+    done = {}
+    errors = queue.Queue()
+    results = queue.Queue()
+    lock = threading.Lock()
+
+    def take():
+        with lock:
+            while todo:
+                item = todo.pop()
+                if groupOf(item) in dead:
+                    done[item] = None
+                else:
+                    started[item] = time.time()
+                    return item
+        return None
+
+    def work():
+        item = take()
+        while item is not None:
+            try:
+                value = func(item)
+            except Exception as e:
+                errors.put("Could not check {}: {}".format(item[1] if isinstance(item, tuple) else item, e))
+                value = None
+            with lock:
+                if item not in started:
+                    return  # timed out and replaced
+                del started[item]
+                done[item] = value
+            results.put(item)
+            item = take()
+
+    def start():
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+
+    for i in range(min(threads, len(items))):
+        start()
+    while True:
+        with lock:
+            if len(done) == len(items):
+                break
+            now = time.time()
+            for item, t in list(started.items()):
+                if now - t >= timeout:
+                    del started[item]
+                    done[item] = None
+                    if groupOf(item) not in dead:
+                        dead.add(groupOf(item))
+                        report("No answer from {} after {} s".format(groupOf(item) or "local disk", timeout))
+                    start()
+            wait = min(started.values()) + timeout - now if started else 0.05
+        try:
+            results.get(True, max(0.01, min(wait, 1.0)))
+        except queue.Empty:
+            pass
+        while not errors.empty():
+            report(errors.get())
+    while not errors.empty():
+        report(errors.get())
+    return done
+
+
+def check_sources(dataSources, threads=CHECK_THREADS, timeout=SHARE_TIMEOUT, list_workspace=None,
+                  report=no_report):
+    """STATUS for each data source path, keyed by source_key: OK, MISSING or
+    UNREACHABLE (its share or drive did not answer within timeout seconds,
+    or its workspace could not be listed). Each share is probed once, in
+    threads with the timeout. Then the containers on the live shares are
+    listed once each however many sources use them: folders in a pool of
+    threads, and workspaces in this thread, with no timeout, as arcpy is
+    not thread safe and a big enterprise geodatabase can take a while. A
+    source in a geodatabase or sde connection is OK when the workspace is
+    there; pass list_workspace (e.g. list_workspace_arcpy) to list each
+    workspace and look for the feature class itself."""
+    t0 = time.time()
+    unique = {}
+    for dataSource in dataSources:
+        unique.setdefault(source_key("", dataSource), dataSource)
+    parts = dict((key, _source_parts(ds)) for key, ds in unique.items())
+    shares = sorted(set(share for share, container, isWorkspace in parts.values() if share))
+    dead = set()
+    shareUp = _run_checks(lambda share: os.path.isdir(share + "\\"), shares, lambda share: share, threads,
+                          timeout, dead, report)
+    containers = sorted(set(p for p in parts.values() if shareUp.get(p[0], True)))
+    folders = [c[1] for c in containers if not c[2]]
+    pool = ThreadPool(max(1, min(threads, len(folders))))
+    try:
+        folderUp = dict(zip(folders, pool.map(_list_folder, folders)))
+        pool.close()
+    except Exception:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    containerUp = dict((c, folderUp[c[1]] if not c[2] else _list_workspace(c[1], list_workspace, report))
+                       for c in containers)
+    status = {}
+    for key, p in parts.items():
+        up = shareUp.get(p[0], True)
+        if up:
+            up = containerUp.get(p)
+            if isinstance(up, set):
+                if p[2]:
+                    up = key in up
+                else:
+                    name = ntpath.basename(unique[key]).lower()
+                    up = name in up or (not ntpath.splitext(name)[1] and name + ".shp" in up)
+        status[key] = STATUS_UNREACHABLE if up is None else STATUS_OK if up else STATUS_MISSING
+    counts = dict((s, list(status.values()).count(s)) for s in (STATUS_OK, STATUS_MISSING, STATUS_UNREACHABLE))
+    report("{} unique data sources checked in {:.1f} s: {} OK, {} missing, {} unreachable ({} shares, {} containers)".format(
+        len(status), time.time() - t0, counts[STATUS_OK], counts[STATUS_MISSING], counts[STATUS_UNREACHABLE],
+        len(shares), len(containers)))
+    return status
+
+
+def layer_sources(results):
+    """Full data source path of every layer that has one."""
+    for relPath, layers in results:
+        for tocNo, lname, fc, folder, kind in layers:
+            if kind == DATASOURCE:
+                yield ntpath.join(folder, fc) if folder else fc
+
+
+def mxd_label(relPath):
+    """Report name for a document: its relative path without the extension."""
+    return os.path.splitext(relPath)[0]
+
+
+def sheet_name(relPath, used):
+    """An xls sheet name for a document that is unique within the workbook."""
+    mx = os.path.basename(relPath)
+    base = mx[:30] if len(mx) > 34 else os.path.splitext(mx)[0]
+    for ch in '[]:*?/\\':
+        base = base.replace(ch, "_")
+    name = base[:31]
+    n = 1
+    while name.lower() in used:
+        n += 1
+        suffix = "({})".format(n)
+        name = base[:31 - len(suffix)] + suffix
+    used.add(name.lower())
+    return name
+
+
+def write_txt_report(path, results, status=None):
+    """Plain text report, one block per document, listing the layers that
+    support DATASOURCE, and their STATUS when status is given."""
+    separator = " " * TXT_SPACE
+    with open(path, "w") as outfile:
+        for relPath, layers in results:
+            print("                           ", relPath, sep="", end="\n", file=outfile)
+            if status is not None:
+                # STATUS lines up with the status on the layer lines below
+                print("LAYER_NAME", "DATA_SOURCE".ljust(TXT_SPACE - 10) + " " + STATUS_HEADER, sep=separator,
+                      end="\n", file=outfile)
+            else:
+                print("LAYER_NAME", "DATA_SOURCE", sep=separator, end="\n", file=outfile)
+            print(TXT_LINE, sep="", end="\n", file=outfile)
+            for tocNo, lname, fc, folder, kind in layers:
+                if kind == DATASOURCE:
+                    space = " " * (TXT_SPACE - len(lname))
+                    if status is not None:
+                        print(lname, fc.ljust(TXT_SPACE) + " " + _status(status, fc, folder),
+                              sep=space, end="\n", file=outfile)
+                    else:
+                        print(lname, fc, sep=space, end="\n", file=outfile)
+            print(TXT_LINE, sep="", end="\n" * 5, file=outfile)
+
+
+def _status(status, fc, folder):
+    return status.get(source_key(folder, fc), "")
+
+
+def sheet_rows(layers, status=None):
+    """Rows of a per-document sheet. The row number is the TOC_NO, so a layer
+    that is neither a group layer nor supports DATASOURCE leaves a blank row.
+    With status (from check_sources) each data source row ends in its STATUS."""
+    for tocNo, lname, fc, folder, kind in layers:
+        if kind == OTHER:
+            yield []
+        elif kind == DATASOURCE:
+            yield [tocNo, lname, fc, folder] + ([_status(status, fc, folder)] if status is not None else [])
+        else:
+            yield [tocNo, lname, fc, None]
+
+
+def table_rows(results, status=None):
+    """Rows of the single table, every document's layers one after another."""
+    for relPath, layers in results:
+        label = mxd_label(relPath)
+        for row in sheet_rows(layers, status):
+            yield [label] + row if row else row
+
+
+def write_sheets_report(path, results, fmt="xls", status=None):
+    """Workbook with a sheet per document (a folder of files for csv)."""
+    header = SHEET_HEADER + [STATUS_HEADER] if status is not None else SHEET_HEADER
+    book = open_report(path, fmt, multi_sheet=True)
+    try:
+        used = set()
+        for relPath, layers in results:
+            sheet = book.add_sheet(sheet_name(relPath, used), header)
+            sheet.write_rows(sheet_rows(layers, status))
+    finally:
+        book.close()
+
+
+def write_table_report(path, results, fmt="xls", status=None):
+    """Workbook with every document's layers in one table."""
+    header = TABLE_HEADER + [STATUS_HEADER] if status is not None else TABLE_HEADER
+    book = open_report(path, fmt)
+    try:
+        sheet = book.add_sheet("DataSourceReport", header)
+        sheet.write_rows(table_rows(results, status))
+    finally:
+        book.close()
+
+if __name__ == '__main__':
+    # Crawl a tree of JSON stand-ins without arcpy, e.g. to time the pool:
+    #   python datasourcelib.py <folder> [processes] [--inventory]
+    import sys
+    from poolutils import parse_processes
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    root = args[0]
+    processes = parse_processes(args[1] if len(args) > 1 else "")
+    inventory = open_inventory(root) if "--inventory" in sys.argv else None
+    for relPath, layers in crawl(root, "json", processes, report=print, inventory=inventory):
+        pass
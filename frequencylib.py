@@ -0,0 +1,709 @@
+#
+#---------------------------------------------------------------------------
+#
+# frequencylib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Value frequencies for ListUniqueValues.py. One scan of the
+#              table feeds a Counter keyed by the tuple of values in the
+#              chosen fields, so the work is one pass over the rows however
+#              many unique values there are. The results can be sorted by
+#              value or by count, cut to the k most frequent, and written as
+#              the Frequency.txt listing, a csv/xls/xlsx file (reportwriters)
+#              or a geodatabase table.
+#
+#              For fields with too many unique values to hold, FrequencySketch
+#              counts approximately in fixed memory for a chosen error:
+#              HyperLogLog estimates the number of unique values (relative
+#              standard error about error) and Space-Saving keeps the most
+#              frequent ones, each count over by at most error x rows. Values
+#              are hashed with md5 so sketches built in different processes
+#              or runs agree, and sketches of separate parts of a table can be
+#              merged.
+#
+#              With NumPy, count_chunks counts a chunk of rows at a time with
+#              numpy.unique(return_counts=True) instead of a Python loop over
+#              every row, and adds each chunk's counts to the Counter. Chunks
+#              come from TableToNumPyArray over ObjectID ranges, or from a csv
+#              file or SQLite table (see FrequencyBenchmark.py). NULLs travel
+#              through the arrays as NULL_TEXT_VALUE, NULL_INT_VALUE (or
+#              NULL_SHORT_VALUE in SmallInteger arrays) or NaN and come back as
+#              None.
+#
+#              count_partitioned splits a big table into ObjectID ranges,
+#              counts each range in a process pool (count_partition) and
+#              merges the Counters or sketches. pivot_frequencies turns the
+#              counts over several fields into a cross-tab on one of them.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import csv, hashlib, heapq, io, math, numbers, os, struct, sys, time
+from collections import Counter
+from poolutils import no_report, pool_results
+from reportwriters import FORMATS, open_report
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Local variables
+PY2 = sys.version_info[0] == 2
+SORTS = ("value", "count")
+FREQUENCY_FIELD = "FREQUENCY"
+NULL_TEXT = "<Null>"
+ERROR_FIELD = "MAX_ERROR"
+TOTAL_FIELD = "TOTAL"
+PIVOT_MAX_COLUMNS = 250
+HLL_MIN_PRECISION = 4
+HLL_MAX_PRECISION = 18
+CHUNK_ROWS = 1000000
+NULL_TEXT_VALUE = u"\x00<Null>"  # stands for NULL in text arrays
+NULL_INT_VALUE = -2147483648     # stands for NULL in integer arrays
+NULL_SHORT_VALUE = -32768        # stands for NULL in SmallInteger (int16) arrays
+NUMPY_TYPES = {"String": "text", "Integer": "int", "SmallInteger": "short", "OID": "int",
+               "Double": "float", "Single": "float"}
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+
+# Functions
+def read_rows_arcpy(table, fields):
+    """Rows of values for fields, from one SearchCursor over table."""
+    import arcpy
+    with arcpy.da.SearchCursor(table, fields) as cursor:
+        for row in cursor:
+            yield row
+
+
+def count_values(rows, report=no_report, every=1000000):
+    """Counter of {(value, ...): rows} from one pass over rows."""
+    t0 = time.time()
+    counts = Counter()
+    n = 0
+    for row in rows:
+        counts[tuple(row)] += 1
+        n += 1
+        if n % every == 0:
+            report("{} rows read, {} unique values so far".format(n, len(counts)))
+    elapsed = max(time.time() - t0, 1e-6)
+    report("{} rows, {} unique values in {:.1f} s ({:.0f} rows/s)".format(n, len(counts), elapsed, n / elapsed))
+    return counts
+
+
+def _is_null(value, nullInt=NULL_INT_VALUE):
+    return value is None or value == NULL_TEXT_VALUE or value == nullInt or value != value  # NaN
+
+
+def _factorize(column):
+    # (values, codes): the distinct values of an array and an int64 code per
+    # row indexing them. numpy.unique sorts text one character at a time,
+    # which is slower than a dict lookup, so text is coded through a dict.
+    if column.dtype.kind in "US":
+        items = column.tolist()
+        values = list(dict.fromkeys(items))
+        index = dict(zip(values, range(len(values))))
+        codes = np.fromiter(map(index.__getitem__, items), np.int64, len(items))
+    else:
+        values, codes = np.unique(column, return_inverse=True)
+        values = values.tolist()
+        codes = codes.reshape(-1).astype(np.int64)
+    # int16 arrays cannot hold NULL_INT_VALUE, so SmallInteger fields have their own stand-in
+    nullInt = NULL_SHORT_VALUE if column.dtype.kind == "i" and column.dtype.itemsize == 2 else NULL_INT_VALUE
+    return [None if _is_null(v, nullInt) else v for v in values], codes
+
+
+def _chunk_frequencies(columns):
+    # The per field codes are combined into one int64 per row and counted
+    # with numpy.bincount, or numpy.unique when the combinations are sparse
+    factors = [_factorize(column) for column in columns]
+    size = 1
+    for values, codes in factors:
+        size *= len(values)
+    if size >= 2 ** 63:
+        # Too many combinations to number in an int64
+        return Counter(zip(*[[values[i] for i in codes.tolist()] for values, codes in factors])).items()
+    codes = factors[0][1]
+    for values, fieldCodes in factors[1:]:
+        codes = codes * len(values) + fieldCodes
+    if size <= 4 * len(codes):
+        freq = np.bincount(codes, minlength=size)
+        combos = np.nonzero(freq)[0]
+        freq = freq[combos]
+    else:
+        combos, freq = np.unique(codes, return_counts=True)
+    keys = []
+    for values, fieldCodes in reversed(factors):
+        # // and % rather than numpy.divmod, which needs NumPy 1.13 (ArcMap has 1.9)
+        combos, index = combos // len(values), combos % len(values)
+        keys.append([values[i] for i in index.tolist()])
+    return zip(zip(*reversed(keys)), freq.tolist())
+
+
+def count_chunks(chunks, report=no_report):
+    """Counter of {(value, ...): rows} from chunks of rows, each a list of
+    NumPy arrays with one array per field."""
+    t0 = time.time()
+    counts = Counter()
+    n = 0
+    for columns in chunks:
+        if len(columns[0]) == 0:
+            continue
+        for key, count in _chunk_frequencies(columns):
+            counts[key] += count
+        n += len(columns[0])
+        report("{} rows read, {} unique values so far".format(n, len(counts)))
+    elapsed = max(time.time() - t0, 1e-6)
+    report("{} rows, {} unique values in {:.1f} s ({:.0f} rows/s)".format(n, len(counts), elapsed, n / elapsed))
+    return counts
+
+
+def _column_array(values):
+    # One field of a chunk as an array, NULLs swapped for the stand-in values
+    kinds = set(map(type, values))
+    hasNull = type(None) in kinds
+    kinds.discard(type(None))
+    if kinds and all(issubclass(k, numbers.Integral) and k is not bool for k in kinds):
+        null, dtype = NULL_INT_VALUE, np.int64
+    elif kinds and all(issubclass(k, numbers.Number) and k is not bool for k in kinds):
+        null, dtype = float("nan"), np.float64
+    else:
+        if not kinds <= set([text_type]):
+            values = [v if v is None or isinstance(v, text_type) else _text(v) for v in values]
+        null, dtype = NULL_TEXT_VALUE, None
+    if hasNull:
+        values = [null if v is None else v for v in values]
+    return np.array(values, dtype=dtype)
+
+
+def _chunk_columns(rows, fieldCount):
+    if not rows:
+        return [np.array([]) for i in range(fieldCount)]
+    return [_column_array(values) for values in zip(*rows)]
+
+
+def oid_ranges(table, chunk_size=CHUNK_ROWS):
+    """[(low, high)] ObjectID ranges of about chunk_size rows covering table."""
+    import arcpy
+    oids = arcpy.da.TableToNumPyArray(table, ["OID@"])["OID@"]
+    if len(oids) == 0:
+        return []
+    oids.sort()
+    bounds = oids[::chunk_size].tolist() + [int(oids[-1]) + 1]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def numpy_null_values(table, fields):
+    """{field: stand-in value for NULL} to read fields with TableToNumPyArray.
+    Raises ValueError for fields NumPy cannot take (dates, blobs...), and for
+    text fields too short to hold NULL_TEXT_VALUE, where the cut down
+    stand-in could be mistaken for a real value."""
+    import arcpy
+    if np is None:
+        raise ValueError("NumPy is not available")
+    sourceFields = dict((f.name.upper(), f) for f in arcpy.ListFields(table))
+    nullValues = {}
+    for field in fields:
+        sourceField = sourceFields[field.upper()]
+        kind = NUMPY_TYPES.get(sourceField.type)
+        if kind is None:
+            raise ValueError("{} is a {} field".format(field, sourceField.type))
+        if kind == "text" and sourceField.length < len(NULL_TEXT_VALUE):
+            raise ValueError("{} is too short to hold the NULL stand-in".format(field))
+        nullValues[field] = {"text": NULL_TEXT_VALUE, "int": NULL_INT_VALUE, "short": NULL_SHORT_VALUE,
+                             "float": float("nan")}[kind]
+    return nullValues
+
+
+def _oid_where(oidField, low, high, where=None):
+    rangeWhere = "{0} >= {1} AND {0} < {2}".format(oidField, low, high)
+    return "({}) AND {}".format(where, rangeWhere) if where else rangeWhere
+
+
+def partition_source(table):
+    """(catalog path, where clause) for opening table in a pool worker. Layer
+    and table view names only exist in the process that made them, so workers
+    open the data behind them with the layer's definition query. Raises
+    ValueError for a layer or view with a selection, which workers cannot
+    see."""
+    import arcpy
+    desc = arcpy.Describe(table)
+    if getattr(desc, "FIDSet", None):
+        raise ValueError("{} has a selection".format(table))
+    return desc.catalogPath, getattr(desc, "whereClause", None) or None
+
+
+def read_chunks_arcpy(table, fields, chunk_size=CHUNK_ROWS):
+    """Chunks of table for count_chunks, one TableToNumPyArray per ObjectID
+    range. Raises ValueError as numpy_null_values."""
+    import arcpy
+    nullValues = numpy_null_values(table, fields)
+    oidField = arcpy.AddFieldDelimiters(table, arcpy.Describe(table).OIDFieldName)
+    return _arcpy_chunks(table, fields, oidField, nullValues, oid_ranges(table, chunk_size))
+
+
+def _arcpy_chunks(table, fields, oidField, nullValues, ranges):
+    import arcpy
+    for low, high in ranges:
+        array = arcpy.da.TableToNumPyArray(table, fields, _oid_where(oidField, low, high), null_value=nullValues)
+        yield [array[field] for field in fields]
+
+
+def count_partition(task):
+    """Pool worker: counts for the rows of one ObjectID range.
+    task is (table, fields, oidField, low, high, where, nullValues, error),
+    table a catalog path and where the definition query of the layer it came
+    from (or None), and the result (low, high, counts, rows, seconds). counts
+    is a FrequencySketch when error is set, and otherwise a Counter, from
+    TableToNumPyArray when nullValues is given and a SearchCursor when it is
+    None."""
+    import arcpy
+    table, fields, oidField, low, high, where, nullValues, error = task
+    t0 = time.time()
+    where = _oid_where(oidField, low, high, where)
+    if error:
+        counts = FrequencySketch(error)
+        with arcpy.da.SearchCursor(table, fields, where) as cursor:
+            for row in cursor:
+                counts.add(tuple(row))
+        rows = counts.rows
+    elif nullValues is not None:
+        array = arcpy.da.TableToNumPyArray(table, fields, where, null_value=nullValues)
+        counts = Counter()
+        if len(array):
+            for key, count in _chunk_frequencies([array[field] for field in fields]):
+                counts[key] += count
+        rows = len(array)
+    else:
+        with arcpy.da.SearchCursor(table, fields, where) as cursor:
+            counts = Counter(tuple(row) for row in cursor)
+        rows = sum(counts.values())
+    return low, high, counts, rows, time.time() - t0
+
+
+def count_partitioned(table, fields, processes, error=None, chunk_size=CHUNK_ROWS, report=no_report):
+    """Counter (or FrequencySketch when error is set) for table, split into
+    ObjectID ranges that are counted in a process pool and merged. Ranges
+    are at most chunk_size rows and small enough to give every process
+    several, so a slow range does not hold up the rest. Layers and table
+    views are counted from their data source with their definition query;
+    raises ValueError for one with a selection (see partition_source)."""
+    import arcpy
+    t0 = time.time()
+    path, where = partition_source(table)
+    nullValues = None
+    if not error:
+        try:
+            nullValues = numpy_null_values(table, fields)
+        except ValueError as e:
+            report("Counting row by row ({})".format(e))
+    rowCount = int(arcpy.GetCount_management(table).getOutput(0))
+    size = max(1, min(chunk_size, int(math.ceil(rowCount / (processes * 4.0)))))
+    ranges = oid_ranges(table, size)
+    oidField = arcpy.AddFieldDelimiters(path, arcpy.Describe(path).OIDFieldName)
+    tasks = [(path, list(fields), oidField, low, high, where, nullValues, error) for low, high in ranges]
+    report("{} rows in {} ObjectID ranges of up to {} rows, {} processes".format(
+        rowCount, len(tasks), size, processes))
+    merged = FrequencySketch(error) if error else Counter()
+    n = 0
+    with pool_results(count_partition, tasks, processes) as results:
+        for done, (low, high, counts, rows, seconds) in enumerate(results, 1):
+            if error:
+                merged.merge(counts)
+            else:
+                merged.update(counts)
+            n += rows
+            report("ObjectIDs {} to {}: {} rows in {:.1f} s ({} of {})".format(
+                low, high - 1, rows, seconds, done, len(tasks)))
+    elapsed = max(time.time() - t0, 1e-6)
+    unique = merged.distinct.estimate() if error else len(merged)
+    report("{} rows, {}{} unique values in {:.1f} s ({:.0f} rows/s)".format(
+        n, "about " if error else "", unique, elapsed, n / elapsed))
+    return merged
+
+
+def read_rows_csv(path, fields):
+    """Rows of values for fields from a csv file with a header row."""
+    if PY2:
+        f = open(path, "rb")
+    else:
+        f = io.open(path, "r", encoding="utf-8", newline="")
+    with f:
+        reader = csv.reader(f)
+        header = [h.decode("utf-8") if PY2 else h for h in next(reader)]
+        upper = [h.upper() for h in header]
+        indexes = [upper.index(field.upper()) for field in fields]
+        for row in reader:
+            if PY2:
+                yield tuple(row[i].decode("utf-8") for i in indexes)
+            else:
+                yield tuple(row[i] for i in indexes)
+
+
+def read_chunks_csv(path, fields, chunk_size=CHUNK_ROWS):
+    """Chunks of a csv file for count_chunks."""
+    rows = []
+    for row in read_rows_csv(path, fields):
+        rows.append(row)
+        if len(rows) == chunk_size:
+            yield [np.array(values) for values in zip(*rows)]
+            rows = []
+    if rows:
+        yield [np.array(values) for values in zip(*rows)]
+
+
+def read_rows_sqlite(path, table, fields):
+    """Rows of values for fields from a SQLite table (or GeoPackage)."""
+    import sqlite3
+    con = sqlite3.connect(path)
+    try:
+        cursor = con.execute('SELECT {} FROM "{}"'.format(", ".join('"{}"'.format(f) for f in fields), table))
+        for row in cursor:
+            yield row
+    finally:
+        con.close()
+
+
+def read_chunks_sqlite(path, table, fields, chunk_size=CHUNK_ROWS):
+    """Chunks of a SQLite table for count_chunks."""
+    import sqlite3
+    con = sqlite3.connect(path)
+    try:
+        cursor = con.execute('SELECT {} FROM "{}"'.format(", ".join('"{}"'.format(f) for f in fields), table))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield _chunk_columns(rows, len(fields))
+    finally:
+        con.close()
+
+
+def _value_key(key):
+    # NULLs sort first, and a field mixing types sorts by type name first
+    return tuple((v is not None, type(v).__name__ if not isinstance(v, (int, float)) else "", v) for v in key)
+
+
+def sort_frequencies(counts, sort="value", top=None):
+    """[(key, count)] sorted by value, or by count (most frequent first, then
+    by value). top keeps only the top most frequent."""
+    if sort not in SORTS:
+        raise ValueError("Unknown sort '{}', expected one of {}".format(sort, ", ".join(SORTS)))
+    if top is not None:
+        items = heapq.nsmallest(top, counts.items(), key=lambda item: (-item[1], _value_key(item[0])))
+    else:
+        items = list(counts.items())
+    if sort == "count":
+        items.sort(key=lambda item: (-item[1], _value_key(item[0])))
+    else:
+        items.sort(key=lambda item: _value_key(item[0]))
+    return items
+
+
+def value_hash(key):
+    """Stable 64 bit hash of a tuple of values, the same in every process and
+    on Python 2 and 3 (unlike hash())."""
+    parts = []
+    for v in key:
+        if v is None:
+            parts.append(u"\0")
+        elif isinstance(v, bytes):
+            parts.append(u"s" + v.decode("utf-8", "replace"))
+        elif isinstance(v, text_type):
+            parts.append(u"s" + v)
+        elif isinstance(v, float) and v.is_integer():
+            parts.append(u"n" + text_type(int(v)))  # 3 and 3.0 are the same value
+        elif isinstance(v, float):
+            parts.append(u"n" + text_type(repr(v)))
+        elif isinstance(v, numbers.Number) and not isinstance(v, bool):
+            parts.append(u"n" + text_type(v))
+        else:
+            parts.append(type(v).__name__[:1] + text_type(v))
+    digest = hashlib.md5(u"\x1f".join(parts).encode("utf-8")).digest()
+    return struct.unpack("<Q", digest[:8])[0]
+
+
+class HyperLogLog(object):
+    """Distinct count estimate in 2 ** precision one byte registers."""
+
+    def __init__(self, precision):
+        if not HLL_MIN_PRECISION <= precision <= HLL_MAX_PRECISION:
+            raise ValueError("HyperLogLog precision must be {} to {}".format(HLL_MIN_PRECISION, HLL_MAX_PRECISION))
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(self.m)
+
+    @classmethod
+    def for_error(cls, error):
+        """Smallest sketch with a relative standard error of at most error."""
+        precision = int(math.ceil(math.log((1.04 / error) ** 2, 2)))
+        return cls(min(max(precision, HLL_MIN_PRECISION), HLL_MAX_PRECISION))
+
+    def add_hash(self, h):
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self):
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(b"\0")
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(float(m) / zeros)  # linear counting for small counts
+        return int(round(estimate))
+
+
+class SpaceSaving(object):
+    """The most frequent values in a stream, in capacity counters. Each count
+    is an overestimate by at most its error, and every error is at most
+    rows / capacity."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.heap = []  # (count, seq, key), may hold stale counts
+        self.seq = 0
+        self.rows = 0
+
+    @classmethod
+    def for_error(cls, error):
+        """Sketch whose counts are over by at most error x rows."""
+        return cls(int(math.ceil(1.0 / error)))
+
+    def add(self, key, count=1):
+        self.rows += count
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+            self._push(count, key)
+            return
+        minimum, victim = self._pop_min()
+        del self.counts[victim]
+        del self.errors[victim]
+        self.counts[key] = minimum + count
+        self.errors[key] = minimum
+        self._push(minimum + count, key)
+
+    def _push(self, count, key):
+        # seq breaks ties so keys (which may not be comparable) never are
+        self.seq += 1
+        heapq.heappush(self.heap, (count, self.seq, key))
+
+    def _pop_min(self):
+        while True:
+            count, seq, key = heapq.heappop(self.heap)
+            if self.counts.get(key) == count:
+                return count, key
+            if key in self.counts:
+                self._push(self.counts[key], key)
+
+    def _floor(self):
+        # What a value that is not kept could have been counted as
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def merge(self, other):
+        """Combine with a sketch of other rows. A value missing from one side
+        is taken at that side's smallest count, so counts stay overestimates."""
+        floor, otherFloor = self._floor(), other._floor()
+        counts = {}
+        errors = {}
+        for key in set(self.counts) | set(other.counts):
+            counts[key] = self.counts.get(key, floor) + other.counts.get(key, otherFloor)
+            errors[key] = self.errors.get(key, floor) + other.errors.get(key, otherFloor)
+        keep = heapq.nlargest(self.capacity, counts, key=lambda key: (counts[key], _value_key(key)))
+        self.counts = dict((key, counts[key]) for key in keep)
+        self.errors = dict((key, errors[key]) for key in keep)
+        self.heap = []
+        for key, count in self.counts.items():
+            self._push(count, key)
+        self.rows += other.rows
+
+    def top(self, n=None):
+        """[(key, count, error)] most frequent first."""
+        items = sorted(self.counts.items(), key=lambda item: (-item[1], _value_key(item[0])))
+        return [(key, count, self.errors[key]) for key, count in items[:n]]
+
+
+class FrequencySketch(object):
+    """Approximate distinct count and most frequent values in fixed memory."""
+
+    def __init__(self, error=0.01):
+        self.error = error
+        self.distinct = HyperLogLog.for_error(error)
+        self.frequent = SpaceSaving.for_error(error)
+
+    @property
+    def rows(self):
+        return self.frequent.rows
+
+    def add(self, key):
+        self.distinct.add_hash(value_hash(key))
+        self.frequent.add(key)
+
+    def merge(self, other):
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+
+    def top(self, n=None, sort="count"):
+        """[(key, count, error)] for the n most frequent values, sorted as in
+        sort_frequencies."""
+        if sort not in SORTS:
+            raise ValueError("Unknown sort '{}', expected one of {}".format(sort, ", ".join(SORTS)))
+        items = self.frequent.top(n)
+        if sort == "value":
+            items.sort(key=lambda item: _value_key(item[0]))
+        return items
+
+    def max_error(self):
+        """Most any count can be over by."""
+        return int(self.rows // self.frequent.capacity)
+
+
+def sketch_values(rows, error=0.01, report=no_report, every=1000000):
+    """FrequencySketch from one pass over rows."""
+    t0 = time.time()
+    sketch = FrequencySketch(error)
+    n = 0
+    for row in rows:
+        sketch.add(tuple(row))
+        n += 1
+        if n % every == 0:
+            report("{} rows read".format(n))
+    elapsed = max(time.time() - t0, 1e-6)
+    report("{} rows, about {} unique values in {:.1f} s ({:.0f} rows/s); {} registers, {} counters".format(
+        n, sketch.distinct.estimate(), elapsed, n / elapsed, sketch.distinct.m, sketch.frequent.capacity))
+    return sketch
+
+
+def pivot_frequencies(fields, items, pivotField):
+    """(header, rows) of a pivot of the (key, count[, error]) items: a row
+    for each combination of the other fields and a column for each value of
+    pivotField, then TOTAL. Raises ValueError when pivotField has more than
+    PIVOT_MAX_COLUMNS values."""
+    upper = [f.upper() for f in fields]
+    if pivotField.upper() not in upper:
+        raise ValueError("Pivot field {} is not one of {}".format(pivotField, ", ".join(fields)))
+    col = upper.index(pivotField.upper())
+    columns = sorted(set((item[0][col],) for item in items), key=_value_key)
+    if len(columns) > PIVOT_MAX_COLUMNS:
+        raise ValueError("{} has {} values, too many to pivot (at most {})".format(
+            pivotField, len(columns), PIVOT_MAX_COLUMNS))
+    position = dict((value, i) for i, (value,) in enumerate(columns))
+    table = {}
+    for item in items:
+        key = item[0]
+        rowKey = key[:col] + key[col + 1:]
+        cells = table.setdefault(rowKey, [0] * len(columns))
+        cells[position[key[col]]] += item[1]
+    header = [f for i, f in enumerate(fields) if i != col] + [_text(value) for value, in columns] + [TOTAL_FIELD]
+    rows = [list(rowKey) + cells + [sum(cells)] for rowKey, cells in
+            sorted(table.items(), key=lambda item: _value_key(item[0]))]
+    return header, rows
+
+
+def parse_error(text):
+    """Error bound from a script tool parameter, as a fraction ("0.01") or a
+    percentage ("1%"). Blank gives None (count exactly)."""
+    text = str(text).strip() if text is not None else ""
+    if text == "" or text == "#":
+        return None
+    error = float(text.rstrip("%")) / 100.0 if text.endswith("%") else float(text)
+    if not 0 < error < 1:
+        raise ValueError("The error bound must be between 0 and 1 (or 0% and 100%), not '{}'".format(text))
+    return error
+
+
+def _text(value):
+    if value is None:
+        return NULL_TEXT
+    if isinstance(value, bytes):
+        return value.decode("utf-8", "replace")
+    return text_type(value)
+
+
+def write_frequency_txt(path, items, note=None):
+    """The Frequency.txt listing: count, tab, then the values tab separated.
+    Approximate items (key, count, error) add "(+/- error)" after the count,
+    and note is written first."""
+    with io.open(path, "w", encoding="utf-8") as f:
+        if note:
+            f.write(text_type(note) + u"\n")
+        for item in items:
+            count = item[1] if len(item) == 2 else u"{} (+/- {})".format(item[1], item[2])
+            f.write(u"{}\t{}\n".format(count, u"\t".join(_text(v) for v in item[0])))
+
+
+def write_frequency_report(path, fields, items, fmt, pivot=None):
+    """A csv, xls or xlsx file with a column per field and FREQUENCY, and
+    MAX_ERROR for approximate items. A pivot from pivot_frequencies goes on a
+    second sheet (a csv report becomes a folder of csv files)."""
+    approximate = bool(items) and len(items[0]) == 3
+    book = open_report(path, fmt, multi_sheet=pivot is not None)
+    try:
+        sheet = book.add_sheet("Frequency", list(fields) + [FREQUENCY_FIELD] + ([ERROR_FIELD] if approximate else []))
+        sheet.write_rows(list(item[0]) + list(item[1:]) for item in items)
+        if pivot is not None:
+            header, rows = pivot
+            book.add_sheet("Pivot", header).write_rows(rows)
+    finally:
+        book.close()
+
+
+def write_pivot_report(path, pivot, fmt):
+    """A csv, xls or xlsx file with just a pivot from pivot_frequencies."""
+    header, rows = pivot
+    book = open_report(path, fmt)
+    try:
+        book.add_sheet("Pivot", header).write_rows(rows)
+    finally:
+        book.close()
+
+
+def write_frequency_table(outTable, table, fields, items):
+    """A geodatabase or dBASE table with the fields, typed as in the source,
+    and FREQUENCY."""
+    import arcpy
+    sourceFields = dict((f.name.upper(), f) for f in arcpy.ListFields(table))
+    folder, name = os.path.split(outTable)
+    arcpy.CreateTable_management(folder, name)
+    outFields = []
+    for field in fields:
+        src = sourceFields[field.upper()]
+        fieldType = {"String": "TEXT", "Integer": "LONG", "SmallInteger": "SHORT", "Double": "DOUBLE",
+                     "Single": "FLOAT", "Date": "DATE", "OID": "LONG", "GUID": "GUID",
+                     "GlobalID": "GUID"}.get(src.type, "TEXT")
+        arcpy.AddField_management(outTable, src.name, fieldType, field_length=src.length if fieldType == "TEXT" else None)
+        outFields.append(arcpy.ListFields(outTable, src.name)[0].name)
+    arcpy.AddField_management(outTable, FREQUENCY_FIELD, "LONG")
+    extra = [FREQUENCY_FIELD]
+    if items and len(items[0]) == 3:
+        arcpy.AddField_management(outTable, ERROR_FIELD, "LONG")
+        extra.append(ERROR_FIELD)
+    with arcpy.da.InsertCursor(outTable, outFields + extra) as cursor:
+        for item in items:
+            cursor.insertRow(list(item[0]) + list(item[1:]))
+
+
+def output_format(path):
+    """Report format for an output path by its extension, or None for a table."""
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    return ext if ext in FORMATS else None
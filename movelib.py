@@ -0,0 +1,546 @@
+#
+#---------------------------------------------------------------------------
+#
+# movelib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Geometry lookup for MoveUsingOtherFeatureGeometry.py that does
+#              not hold the "To" geometries in memory. GeometryStore appends
+#              each key and its WKB to a data file and indexes them in a
+#              memory-mapped open addressing hash table, so a lookup is one
+#              probe of the index and one read of the data file, and memory
+#              stays flat however many features or vertices there are.
+#              Index slots are SLOT_FORMAT: key hash, data offset, record
+#              length. The table is sized from the feature count for a load
+#              of at most MAX_LOAD and doubles if more keys arrive.
+#              Keys are compared by value, with whole number doubles equal to
+#              integers (TREE_ID 5.0 matches 5) as a Python dict would.
+#              A repeated key keeps the last geometry, as the dict did, and
+#              is counted in duplicates.
+#
+#              The move is done in two phases. find_changes reads the "From"
+#              features once and keeps only those whose geometry differs from
+#              the stored one, comparing WKB x and y within the XY tolerance
+#              and z and m exactly in plain Python (wkb_parts). The (ObjectID,
+#              key) of each goes to a ChangeFile beside the store, BATCH_SIZE
+#              to a record, so the change set is not held in memory. Once the
+#              read has finished, apply_changes writes each batch in an edit
+#              operation, reporting progress at most every PROGRESS_SECONDS.
+#
+#              When both feature classes are large and indexed on the common
+#              field, merge_changes does the first phase as a sort-merge join
+#              instead: both are read in ORDER BY key order and walked
+#              together, so neither side is stored whole and only the changed
+#              geometries go into a GeometryStore, and the changes into a
+#              ChangeFile for apply_changes. Duplicate and unmatched
+#              keys on either side are counted, and a source that does not
+#              come back in order raises MergeOrderError so the caller can
+#              fall back to the hash join. choose_join picks between them.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import hashlib, itertools, mmap, operator, os, pickle, shutil, struct, tempfile, time
+from poolutils import no_report
+
+# Local variables
+SLOT_FORMAT = "<QQI"  # key hash (0 = empty), data offset, record length
+SLOT_SIZE = struct.calcsize(SLOT_FORMAT)
+KEY_LENGTH_FORMAT = "<I"
+KEY_LENGTH_SIZE = struct.calcsize(KEY_LENGTH_FORMAT)
+MAX_LOAD = 0.7
+MIN_SLOTS = 1024
+BATCH_SIZE = 1000
+PROGRESS_SECONDS = 5.0
+WKB_POINT, WKB_LINESTRING, WKB_POLYGON = 1, 2, 3
+JOINS = ("auto", "hash", "merge")
+MERGE_MIN_ROWS = 1000000  # auto uses a merge join when both sides have this many
+EXAMPLE_KEYS = 10
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+
+class MergeOrderError(ValueError):
+    pass
+
+
+# Functions
+def key_bytes(value):
+    """The bytes a key is stored and compared by."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool):
+        return b"b" + str(int(value)).encode("ascii")
+    if isinstance(value, (int, float)) or type(value).__name__ == "long":
+        return b"n" + repr(value).rstrip("L").encode("ascii")
+    if isinstance(value, bytes):
+        return b"s" + value
+    if isinstance(value, text_type):
+        return b"s" + value.encode("utf-8")
+    return b"o" + text_type(value).encode("utf-8")
+
+
+def _key_hash(keyBytes):
+    h = struct.unpack("<Q", hashlib.md5(keyBytes).digest()[:8])[0]
+    return h or 1
+
+
+def _slot_count(count):
+    slots = MIN_SLOTS
+    while slots * MAX_LOAD < count:
+        slots *= 2
+    return slots
+
+
+class GeometryStore(object):
+    """Disk-backed {key: WKB}. Use add() for every feature, then get()."""
+
+    def __init__(self, count=0, folder=None):
+        self.folder = tempfile.mkdtemp(prefix="geomstore_", dir=folder)
+        self.data = open(os.path.join(self.folder, "geometry.dat"), "w+b")
+        self.size = 0
+        self.count = 0
+        self.duplicates = 0
+        self.index = None
+        self._open_index(_slot_count(count))
+
+    def _open_index(self, slots):
+        path = os.path.join(self.folder, "index{}.dat".format(slots))
+        with open(path, "wb") as f:
+            f.truncate(slots * SLOT_SIZE)
+        self.indexFile = open(path, "r+b")
+        self.index = mmap.mmap(self.indexFile.fileno(), slots * SLOT_SIZE)
+        self.slots = slots
+        self.mask = slots - 1
+
+    def _probe(self, h, keyBytes):
+        # (slot, offset, length) of the key, or of the empty slot it would go in
+        slot = h & self.mask
+        while True:
+            slotHash, offset, length = struct.unpack_from(SLOT_FORMAT, self.index, slot * SLOT_SIZE)
+            if slotHash == 0:
+                return slot, None, None
+            if slotHash == h and self._read_key(offset) == keyBytes:
+                return slot, offset, length
+            slot = (slot + 1) & self.mask
+
+    def _read_key(self, offset):
+        self.data.seek(offset)
+        keyLength = struct.unpack(KEY_LENGTH_FORMAT, self.data.read(KEY_LENGTH_SIZE))[0]
+        return self.data.read(keyLength)
+
+    def _grow(self):
+        oldIndex, oldFile, oldSlots = self.index, self.indexFile, self.slots
+        self._open_index(oldSlots * 2)
+        for slot in range(oldSlots):
+            entry = struct.unpack_from(SLOT_FORMAT, oldIndex, slot * SLOT_SIZE)
+            if entry[0]:
+                newSlot = entry[0] & self.mask
+                while struct.unpack_from(SLOT_FORMAT, self.index, newSlot * SLOT_SIZE)[0]:
+                    newSlot = (newSlot + 1) & self.mask
+                struct.pack_into(SLOT_FORMAT, self.index, newSlot * SLOT_SIZE, *entry)
+        oldIndex.close()
+        oldFile.close()
+        os.remove(oldFile.name)
+
+    def add(self, key, wkb):
+        """Store the WKB (bytes or bytearray) for key. A key seen before is
+        replaced."""
+        keyBytes = key_bytes(key)
+        h = _key_hash(keyBytes)
+        slot, offset, length = self._probe(h, keyBytes)
+        if offset is not None:
+            self.duplicates += 1
+        else:
+            self.count += 1
+        record = struct.pack(KEY_LENGTH_FORMAT, len(keyBytes)) + keyBytes + bytes(wkb)
+        self.data.seek(self.size)
+        self.data.write(record)
+        struct.pack_into(SLOT_FORMAT, self.index, slot * SLOT_SIZE, h, self.size, len(record))
+        self.size += len(record)
+        if self.count > self.slots * MAX_LOAD:
+            self._grow()
+
+    def get(self, key, default=None):
+        """The WKB stored for key, or default."""
+        keyBytes = key_bytes(key)
+        slot, offset, length = self._probe(_key_hash(keyBytes), keyBytes)
+        if offset is None:
+            return default
+        self.data.seek(offset + KEY_LENGTH_SIZE + len(keyBytes))
+        return self.data.read(length - KEY_LENGTH_SIZE - len(keyBytes))
+
+    def __contains__(self, key):
+        keyBytes = key_bytes(key)
+        return self._probe(_key_hash(keyBytes), keyBytes)[1] is not None
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        """Release and delete the store's files."""
+        if self.index is not None:
+            self.index.close()
+            self.indexFile.close()
+            self.data.close()
+            self.index = None
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _add_ordinates(values, size, xy, zm):
+    # x and y of each point to xy, and any z and m to zm
+    if size == 2:
+        xy.extend(values)
+        return
+    for i in range(0, len(values), size):
+        xy.extend(values[i:i + 2])
+        zm.extend(values[i + 2:i + size])
+
+
+class ChangeFile(object):
+    """(ObjectID, key) pairs of the features to move, spilled to a file in
+    folder a batch at a time, so the change set is not held in memory.
+    add() each change, then finish() before reading the batches back by
+    iterating."""
+
+    def __init__(self, folder, batch_size=BATCH_SIZE):
+        self.path = os.path.join(folder, "changes.dat")
+        self.batch_size = batch_size
+        self.count = 0
+        self.batch = []
+        self.f = open(self.path, "wb")
+
+    def add(self, oid, key):
+        self.batch.append((oid, key))
+        self.count += 1
+        if len(self.batch) == self.batch_size:
+            self._dump()
+
+    def _dump(self):
+        pickle.dump(self.batch, self.f, 2)
+        self.batch = []
+
+    def finish(self):
+        if self.f is not None:
+            if self.batch:
+                self._dump()
+            self.f.close()
+            self.f = None
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def __len__(self):
+        return self.count
+
+
+def _read_wkb(wkb, pos, shape, xy, zm):
+    # Appends the structure to shape and the ordinates to xy and zm, returns
+    # the position after the geometry
+    endian = "<" if struct.unpack_from("B", wkb, pos)[0] == 1 else ">"
+    wkbType = struct.unpack_from(endian + "I", wkb, pos + 1)[0]
+    pos += 5
+    hasZ = bool(wkbType & 0x80000000)  # EWKB flags
+    hasM = bool(wkbType & 0x40000000)
+    wkbType &= 0x0FFFFFFF
+    dims, base = divmod(wkbType, 1000)  # ISO 1000 Z, 2000 M, 3000 ZM
+    hasZ = hasZ or dims in (1, 3)
+    hasM = hasM or dims in (2, 3)
+    size = 2 + hasZ + hasM
+    shape.append((base, hasZ, hasM))
+    if base == WKB_POINT:
+        _add_ordinates(struct.unpack_from(endian + "{}d".format(size), wkb, pos), size, xy, zm)
+        return pos + 8 * size
+    count = struct.unpack_from(endian + "I", wkb, pos)[0]
+    pos += 4
+    shape.append(count)
+    if base == WKB_LINESTRING:
+        _add_ordinates(struct.unpack_from(endian + "{}d".format(count * size), wkb, pos), size, xy, zm)
+        return pos + 8 * count * size
+    if base == WKB_POLYGON:
+        for ring in range(count):
+            points = struct.unpack_from(endian + "I", wkb, pos)[0]
+            shape.append(points)
+            _add_ordinates(struct.unpack_from(endian + "{}d".format(points * size), wkb, pos + 4), size, xy, zm)
+            pos += 4 + 8 * points * size
+        return pos
+    for part in range(count):  # multipoint, multilinestring, multipolygon, collection
+        pos = _read_wkb(wkb, pos, shape, xy, zm)
+    return pos
+
+
+def wkb_parts(wkb):
+    """(shape, xy, zm) of a WKB geometry: its types, Z and M flags and part,
+    ring and point counts, every x and y in order, and every z and m."""
+    shape = []
+    xy = []
+    zm = []
+    _read_wkb(wkb, 0, shape, xy, zm)
+    return shape, xy, zm
+
+
+def same_geometry(wkb1, wkb2, tolerance=0.0):
+    """True when two WKB geometries have the same structure, every x and y
+    within tolerance (an XY tolerance) and every z and m equal. NaN
+    ordinates (empty M) match each other."""
+    if wkb1 == wkb2:
+        return True
+    shape1, xy1, zm1 = wkb_parts(wkb1)
+    shape2, xy2, zm2 = wkb_parts(wkb2)
+    if shape1 != shape2:
+        return False
+    for a, b in zip(xy1, xy2):
+        if abs(a - b) > tolerance and not (a != a and b != b):
+            return False
+    for a, b in zip(zm1, zm2):
+        if a != b and not (a != a and b != b):
+            return False
+    return True
+
+
+def find_changes(fc, keyField, store, tolerance=0.0, compare=True, report=no_report, every=100000,
+                 batch_size=BATCH_SIZE):
+    """ChangeFile (in the store's folder) of the features of fc with a key in
+    store whose geometry differs from the stored one (see same_geometry),
+    and a dict of counts: features, matched, unchanged, changed, unmatched
+    (no key in store). compare=False treats every matched feature as
+    changed. fc is read to the end before anything is written."""
+    import arcpy
+    t0 = time.time()
+    changes = ChangeFile(store.folder, batch_size)
+    counts = dict(features=0, matched=0, unchanged=0, changed=0, unmatched=0)
+    try:
+        with arcpy.da.SearchCursor(fc, ["OID@", keyField, "SHAPE@WKB"]) as cur:
+            for oid, key, wkb in cur:
+                counts["features"] += 1
+                newWkb = store.get(key) if key is not None else None
+                if newWkb is None:
+                    counts["unmatched"] += 1
+                elif compare and wkb is not None and same_geometry(bytes(wkb), newWkb, tolerance):
+                    counts["matched"] += 1
+                    counts["unchanged"] += 1
+                else:
+                    counts["matched"] += 1
+                    counts["changed"] += 1
+                    changes.add(oid, key)
+                if counts["features"] % every == 0:
+                    report("{} features compared, {} to move".format(counts["features"], counts["changed"]))
+    finally:
+        changes.finish()
+    report("{features} features: {matched} matched, {unchanged} already in place, {changed} to move, "
+           "{unmatched} with no match".format(**counts) + " ({:.1f} s)".format(time.time() - t0))
+    return changes, counts
+
+
+def apply_changes(fc, workspace, changes, store, spatialRef, report=no_report, refresh=None,
+                  progress_seconds=PROGRESS_SECONDS):
+    """Write the stored geometry to each (ObjectID, key) in changes (a
+    ChangeFile), a batch to an edit operation. Reports progress and calls
+    refresh at most every progress_seconds. Returns the number of features
+    written."""
+    import arcpy
+    desc = arcpy.Describe(fc)
+    oidField = arcpy.AddFieldDelimiters(fc, desc.OIDFieldName)
+    t0 = lastReport = time.time()
+    moved = 0
+    edit = arcpy.da.Editor(workspace)
+    edit.startEditing(False, bool(getattr(desc, "isVersioned", False)))
+    try:
+        for batch in changes:
+            batch = dict(batch)
+            where = "{} IN ({})".format(oidField, ",".join(str(oid) for oid in sorted(batch)))
+            edit.startOperation()
+            try:
+                with arcpy.da.UpdateCursor(fc, ["OID@", "SHAPE@"], where) as cur:
+                    for row in cur:
+                        row[1] = arcpy.FromWKB(bytearray(store.get(batch[row[0]])), spatialRef)
+                        cur.updateRow(row)
+                        moved += 1
+            except Exception:
+                edit.abortOperation()
+                raise
+            edit.stopOperation()
+            if time.time() - lastReport >= progress_seconds:
+                lastReport = time.time()
+                report("{} of {} features moved ({:.0f} per second)".format(
+                    moved, len(changes), moved / max(lastReport - t0, 1e-6)))
+                if refresh is not None:
+                    refresh()
+        edit.stopEditing(True)
+    except Exception:
+        if edit.isEditing:
+            edit.stopEditing(False)
+        raise
+    report("{} features moved in {:.1f} s".format(moved, time.time() - t0))
+    return moved
+
+
+def _has_index(fc, field):
+    import arcpy
+    return any(field.upper() in [f.name.upper() for f in index.fields] for index in arcpy.ListIndexes(fc))
+
+
+def can_merge(fc, keyField):
+    """True when fc can be read in key order (a geodatabase or database table)
+    and has an attribute index on keyField."""
+    import arcpy
+    desc = arcpy.Describe(fc)
+    if desc.dataType == "ShapeFile" or arcpy.Describe(os.path.dirname(desc.catalogPath)).dataType == "Folder":
+        return False
+    return _has_index(fc, keyField)
+
+
+def choose_join(fromFC, fromField, toFC, toField, join="auto", report=no_report):
+    """"hash" or "merge". auto uses a merge join when both sides have at least
+    MERGE_MIN_ROWS features and can_merge, and a hash join otherwise."""
+    import arcpy
+    join = (join or "auto").strip().lower()
+    if join not in JOINS:
+        raise ValueError("Unknown join '{}', expected one of {}".format(join, ", ".join(JOINS)))
+    if join != "auto":
+        return join
+    fromCount = int(arcpy.GetCount_management(fromFC).getOutput(0))
+    toCount = int(arcpy.GetCount_management(toFC).getOutput(0))
+    if min(fromCount, toCount) < MERGE_MIN_ROWS:
+        join = "hash"
+    elif can_merge(fromFC, fromField) and can_merge(toFC, toField):
+        join = "merge"
+    else:
+        report("Both sides are large but not indexed geodatabase data, so the join cannot read them in key order")
+        join = "hash"
+    report("{} From and {} To features, using a {} join".format(fromCount, toCount, join))
+    return join
+
+
+def _ordered_rows(fc, fields, keyField):
+    # Rows with a key in ORDER BY key order, checked as they arrive
+    import arcpy
+    name = arcpy.AddFieldDelimiters(fc, keyField)
+    previous = None
+    with arcpy.da.SearchCursor(fc, fields, "{} IS NOT NULL".format(name),
+                               sql_clause=(None, "ORDER BY {}".format(name))) as cur:
+        for row in cur:
+            if previous is not None and row[0] < previous:
+                raise MergeOrderError("{} is not in {} order ({!r} came after {!r}), the database sorts "
+                                      "differently".format(fc, keyField, row[0], previous))
+            previous = row[0]
+            yield row
+
+
+def merge_changes(fromFC, fromField, toFC, toField, tolerance=0.0, compare=True, folder=None, report=no_report,
+                  every=100000, batch_size=BATCH_SIZE):
+    """As find_changes, by a sort-merge join of the two feature classes in key
+    order. Returns (changes, counts, store) where store holds the To geometry
+    of just the changed features and changes is a ChangeFile in its folder.
+    counts also has toUnmatched (To features with no From feature) and
+    fromDuplicates and toDuplicates (keys on more than one feature). Raises
+    MergeOrderError if a side is not in key order."""
+    t0 = time.time()
+    counts = dict(features=0, matched=0, unchanged=0, changed=0, unmatched=0, toUnmatched=0,
+                  fromDuplicates=0, toDuplicates=0)
+    examples = dict((name, []) for name in ("unmatched", "toUnmatched", "fromDuplicates", "toDuplicates"))
+    store = GeometryStore(0, folder)
+    changes = None
+    byKey = operator.itemgetter(0)
+
+    def note(name, key, n=1):
+        counts[name] += n
+        if len(examples[name]) < EXAMPLE_KEYS:
+            examples[name].append(key)
+
+    try:
+        changes = ChangeFile(store.folder, batch_size)
+        fromGroups = itertools.groupby(_ordered_rows(fromFC, [fromField, "OID@", "SHAPE@WKB"], fromField), byKey)
+        toGroups = itertools.groupby(_ordered_rows(toFC, [toField, "SHAPE@WKB"], toField), byKey)
+        fromGroup = next(fromGroups, None)
+        toGroup = next(toGroups, None)
+        while fromGroup is not None or toGroup is not None:
+            if toGroup is not None and (fromGroup is None or toGroup[0] < fromGroup[0]):
+                note("toUnmatched", toGroup[0], sum(1 for row in toGroup[1]))
+                toGroup = next(toGroups, None)
+                continue
+            fromRows = list(fromGroup[1])
+            counts["features"] += len(fromRows)
+            if len(fromRows) > 1:
+                note("fromDuplicates", fromGroup[0])
+            toRows = []
+            if toGroup is not None and toGroup[0] == fromGroup[0]:
+                toRows = list(toGroup[1])
+                if len(toRows) > 1:
+                    note("toDuplicates", toGroup[0])
+                toGroup = next(toGroups, None)
+            toRows = [row for row in toRows if row[1] is not None]
+            if not toRows:
+                note("unmatched", fromGroup[0], len(fromRows))
+            else:
+                newWkb = bytes(toRows[-1][1])  # the last, as the hash join keeps
+                for key, oid, wkb in fromRows:
+                    counts["matched"] += 1
+                    if compare and wkb is not None and same_geometry(bytes(wkb), newWkb, tolerance):
+                        counts["unchanged"] += 1
+                    else:
+                        counts["changed"] += 1
+                        changes.add(oid, key)
+                        if key not in store:
+                            store.add(key, newWkb)
+            if counts["features"] // every != (counts["features"] - len(fromRows)) // every:
+                report("{} features compared, {} to move".format(counts["features"], counts["changed"]))
+            fromGroup = next(fromGroups, None)
+        changes.finish()
+    except Exception:
+        if changes is not None:
+            changes.finish()
+        store.close()
+        raise
+    report("{features} features: {matched} matched, {unchanged} already in place, {changed} to move, "
+           "{unmatched} with no match, {toUnmatched} To features unused".format(**counts) +
+           " ({:.1f} s)".format(time.time() - t0))
+    for name, label in (("unmatched", "From features with no To feature"),
+                        ("toUnmatched", "To features with no From feature"),
+                        ("fromDuplicates", "From keys on more than one feature"),
+                        ("toDuplicates", "To keys on more than one feature (the last is used)")):
+        if counts[name]:
+            report("{} {}, e.g. {}".format(counts[name], label, ", ".join(repr(k) for k in examples[name])))
+    return changes, counts, store
+
+
+def build_geometry_store(fc, keyField, folder=None, report=no_report, every=100000):
+    """GeometryStore of {keyField value: WKB} for the features of fc, read with
+    one SearchCursor. Features with a NULL key or geometry are skipped."""
+    import arcpy
+    t0 = time.time()
+    count = int(arcpy.GetCount_management(fc).getOutput(0))
+    store = GeometryStore(count, folder)
+    skipped = 0
+    try:
+        with arcpy.da.SearchCursor(fc, [keyField, "SHAPE@WKB"]) as cur:
+            for n, (key, wkb) in enumerate(cur, 1):
+                if key is None or wkb is None:
+                    skipped += 1
+                else:
+                    store.add(key, wkb)
+                if n % every == 0:
+                    report("{} of {} geometries stored".format(n, count))
+    except Exception:
+        store.close()
+        raise
+    elapsed = max(time.time() - t0, 1e-6)
+    report("{} geometries stored in {:.1f} s ({:.0f} MB on disk, {} index slots), {} duplicate keys, "
+           "{} skipped with no key or geometry".format(len(store), elapsed, store.size / 1048576.0, store.slots,
+                                                     store.duplicates, skipped))
+    return store
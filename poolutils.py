@@ -0,0 +1,91 @@
+#
+#---------------------------------------------------------------------------
+#
+# poolutils.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Helpers for running script tool work in a multiprocessing pool.
+#              Scripts that use a pool must keep their main code under
+#              if __name__ == '__main__': so worker processes can import them
+#              on Windows, and the tool should be set to run out of process.
+#              Also the small helpers the libraries that use it share: a
+#              report callback that does nothing, file hashing, atomic JSON
+#              saves and splitting paths into parts.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import contextlib, hashlib, json, os, re, sys, multiprocessing
+
+# Local variables
+path_part_re = re.compile(r"[^\\/]+")  # one folder or file name in a path
+
+
+# Functions
+def no_report(msg):
+    pass
+
+
+def parse_processes(text, default=1):
+    """Turn a script tool parameter into a process count.
+    Blank gives the default, 0 or a negative number means one per core."""
+    text = str(text).strip() if text is not None else ""
+    if text == "" or text == "#":
+        return default
+    processes = int(float(text))
+    if processes <= 0:
+        processes = multiprocessing.cpu_count()
+    return processes
+
+
+def get_pool(processes):
+    """Create a process pool. When running inside ArcMap/ArcGIS Pro the
+    current executable is the application, not Python, so workers are
+    started with the pythonw.exe that ships with it instead."""
+    exe = os.path.basename(sys.executable).lower()
+    if not exe.startswith("python"):
+        pythonw = os.path.join(sys.exec_prefix, "pythonw.exe")
+        if os.path.exists(pythonw):
+            multiprocessing.set_executable(pythonw)
+    return multiprocessing.Pool(processes)
+
+
+@contextlib.contextmanager
+def pool_results(func, tasks, processes, ordered=False):
+    """Context manager giving an iterator of func(task) for each of tasks
+    (a list), from a pool of up to processes when there is more than one of
+    each and otherwise run in this process. Results come in task order when
+    ordered is set and as they finish when not. On leaving, the pool is
+    closed, or terminated if an exception was raised, and joined."""
+    if processes <= 1 or len(tasks) <= 1:
+        yield (func(task) for task in tasks)
+        return
+    pool = get_pool(min(processes, len(tasks)))
+    try:
+        yield pool.imap(func, tasks) if ordered else pool.imap_unordered(func, tasks)
+        pool.close()
+    except BaseException:  # GeneratorExit too, when a generator using it is closed early
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+
+def file_sha1(path):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def save_json(path, obj):
+    """Write obj to path as JSON by way of a temporary file, so an
+    interrupted write leaves the old file whole."""
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=1, sort_keys=True)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp, path)
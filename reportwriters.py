@@ -0,0 +1,312 @@
+#
+#---------------------------------------------------------------------------
+#
+# reportwriters.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Spreadsheet writers for the report scripts. Each writer takes
+#              sheets one after another and rows in bulk:
+#                  report = open_report(path, "xlsx")
+#                  sheet = report.add_sheet("Data Sources", header)
+#                  sheet.write_rows(rows)
+#                  report.close()
+#              "xls"  - xlwt workbook, held in memory until saved.
+#              "xlsx" - streamed to temporary files and zipped on close, so
+#                       memory use stays flat however many rows are written.
+#              "csv"  - one file, or a folder with one file per sheet when
+#                       the report has several sheets.
+#              A sheet that reaches the format's row limit carries on in a new
+#              sheet with the same header, so there is no ceiling on rows.
+#              An empty row ([]) leaves a blank line in the sheet.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import csv, io, os, re, shutil, sys, tempfile, zipfile
+from xml.sax.saxutils import escape
+
+# Local variables
+PY2 = sys.version_info[0] == 2
+FORMATS = ("xls", "xlsx", "csv")
+XLS_MAX_ROWS = 65536
+XLSX_MAX_ROWS = 1048576
+illegal_xml_re = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{}</Types>')
+SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>')
+WORKBOOK = (
+    u'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    u'<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    u'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    u'<sheets>{}</sheets></workbook>')
+WORKBOOK_SHEET = u'<sheet name="{}" sheetId="{}" r:id="rId{}"/>'
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{}<Relationship Id="rId{}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/></Relationships>')
+WORKBOOK_REL = (
+    '<Relationship Id="rId{0}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{0}.xml"/>')
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/></cellXfs>'
+    '</styleSheet>')
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+SHEET_END = '</sheetData></worksheet>'
+
+
+# Functions
+def _text(value):
+    if isinstance(value, bytes):
+        return value.decode('utf-8')
+    return text_type(value)
+
+
+def column_letter(col):
+    letters = ""
+    col += 1
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def open_report(path, fmt, multi_sheet=False):
+    """Open a report writer for one of FORMATS. multi_sheet only matters for
+    csv, where each sheet then goes to its own file in a folder named after
+    the report."""
+    if fmt == "xls":
+        return XlsReport(path)
+    if fmt == "xlsx":
+        return XlsxReport(path)
+    if fmt == "csv":
+        return CsvReport(path, multi_sheet)
+    raise ValueError("Unknown report format '{}', expected one of {}".format(fmt, ", ".join(FORMATS)))
+
+
+def parse_format(text, default="xls"):
+    """Turn a script tool parameter into one of FORMATS. Blank gives the default."""
+    fmt = str(text).strip().lower().lstrip(".") if text is not None else ""
+    if fmt == "" or fmt == "#":
+        return default
+    if fmt not in FORMATS:
+        raise ValueError("Unknown report format '{}', expected one of {}".format(fmt, ", ".join(FORMATS)))
+    return fmt
+
+
+def report_path(path, fmt):
+    """Swap the extension of a report path for the format's own."""
+    return os.path.splitext(path)[0] + "." + fmt
+
+
+class Sheet(object):
+    """Rows for one named sheet. Starts a continuation sheet when the format's
+    row limit is reached."""
+
+    def __init__(self, report, name, header):
+        self.report = report
+        self.name = name
+        self.header = header
+        self.part = 1
+        self.rowNo = 0
+        self.report._begin_sheet(name)
+        self._header()
+
+    def _header(self):
+        if self.header:
+            self.report._write_row(self.rowNo, self.header)
+            self.rowNo += 1
+
+    def write_rows(self, rows):
+        limit = self.report.max_rows
+        for row in rows:
+            if limit and self.rowNo >= limit:
+                self.part += 1
+                self.rowNo = 0
+                suffix = " ({})".format(self.part)
+                self.report._begin_sheet(self.name[:31 - len(suffix)] + suffix)
+                self._header()
+            if row:
+                self.report._write_row(self.rowNo, row)
+            else:
+                self.report._blank_row(self.rowNo)
+            self.rowNo += 1
+
+
+class XlsReport(object):
+    max_rows = XLS_MAX_ROWS
+
+    def __init__(self, path):
+        import xlwt
+        self.path = path
+        self.book = xlwt.Workbook()
+        self.sheet = None
+
+    def add_sheet(self, name, header=None):
+        return Sheet(self, name, header)
+
+    def _begin_sheet(self, name):
+        self.sheet = self.book.add_sheet(name)
+
+    def _write_row(self, rowNo, row):
+        for col, value in enumerate(row):
+            if value is not None and value != "":
+                self.sheet.write(rowNo, col, value)
+
+    def _blank_row(self, rowNo):
+        pass
+
+    def close(self):
+        self.book.save(self.path)
+
+
+class XlsxReport(object):
+    max_rows = XLSX_MAX_ROWS
+
+    def __init__(self, path):
+        self.path = path
+        self.names = []
+        self.parts = []
+        self.out = None
+        self.tmpDir = tempfile.mkdtemp(prefix="xlsx_")
+        self.columns = []
+
+    def add_sheet(self, name, header=None):
+        return Sheet(self, name, header)
+
+    def _begin_sheet(self, name):
+        self._end_sheet()
+        part = os.path.join(self.tmpDir, "sheet{}.xml".format(len(self.parts) + 1))
+        self.names.append(name)
+        self.parts.append(part)
+        self.out = io.open(part, "w", encoding="utf-8")
+        self.out.write(_text(SHEET_START))
+
+    def _end_sheet(self):
+        if self.out is not None:
+            self.out.write(_text(SHEET_END))
+            self.out.close()
+            self.out = None
+
+    def _cell(self, ref, value):
+        if isinstance(value, bool):
+            return u'<c r="{}" t="b"><v>{}</v></c>'.format(ref, int(value))
+        if isinstance(value, (int, float)) or (PY2 and isinstance(value, long)):
+            return u'<c r="{}"><v>{}</v></c>'.format(ref, repr(value) if isinstance(value, float) else value)
+        text = escape(illegal_xml_re.sub(u"", _text(value)))
+        return u'<c r="{}" t="inlineStr"><is><t xml:space="preserve">{}</t></is></c>'.format(ref, text)
+
+    def _write_row(self, rowNo, row):
+        while len(self.columns) < len(row):
+            self.columns.append(column_letter(len(self.columns)))
+        r = rowNo + 1
+        cells = u"".join(self._cell(u"{}{}".format(self.columns[col], r), value)
+                         for col, value in enumerate(row) if value is not None and value != "")
+        self.out.write(u'<row r="{}">{}</row>'.format(r, cells))
+
+    def _blank_row(self, rowNo):
+        pass
+
+    def close(self):
+        self._end_sheet()
+        count = len(self.parts)
+        try:
+            with zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED) as zf:
+                zf.writestr("[Content_Types].xml", CONTENT_TYPES.format(
+                    "".join(SHEET_CONTENT_TYPE.format(i) for i in range(1, count + 1))))
+                zf.writestr("_rels/.rels", ROOT_RELS)
+                sheets = u"".join(WORKBOOK_SHEET.format(escape(_text(name), {'"': "&quot;"}), i, i)
+                                  for i, name in enumerate(self.names, 1))
+                zf.writestr("xl/workbook.xml", WORKBOOK.format(sheets).encode("utf-8"))
+                zf.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS.format(
+                    "".join(WORKBOOK_REL.format(i) for i in range(1, count + 1)), count + 1))
+                zf.writestr("xl/styles.xml", STYLES)
+                for i, part in enumerate(self.parts, 1):
+                    zf.write(part, "xl/worksheets/sheet{}.xml".format(i))
+        finally:
+            shutil.rmtree(self.tmpDir, ignore_errors=True)
+
+
+class CsvReport(object):
+    max_rows = None
+
+    def __init__(self, path, multi_sheet=False):
+        self.path = path
+        self.folder = os.path.splitext(path)[0] if multi_sheet else None
+        if self.folder and not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        self.f = None
+        self.writer = None
+
+    def add_sheet(self, name, header=None):
+        return Sheet(self, name, header)
+
+    def _begin_sheet(self, name):
+        self._end_sheet()
+        if self.folder:
+            safe = re.sub(r'[\\/:*?"<>|]', "_", name)
+            path = os.path.join(self.folder, safe + ".csv")
+        elif self.f is None and self.writer is None:
+            path = self.path
+        else:
+            return  # a single csv has no row limit, so no second sheet
+        if PY2:
+            self.f = open(path, "wb")
+        else:
+            self.f = io.open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.f)
+
+    def _end_sheet(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+
+    def _encode(self, value):
+        if value is None:
+            return ""
+        if PY2 and isinstance(value, unicode):
+            return value.encode("utf-8")
+        return value
+
+    def _write_row(self, rowNo, row):
+        self.writer.writerow([self._encode(v) for v in row])
+
+    def _blank_row(self, rowNo):
+        self.writer.writerow([])
+
+    def close(self):
+        self._end_sheet()
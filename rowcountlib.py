@@ -0,0 +1,466 @@
+#
+#---------------------------------------------------------------------------
+#
+# rowcountlib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Row counting for GetRowCount.py. Each layer is reduced to its
+#              (data source, definition query) pair; pairs shared by several
+#              layers are counted once, and the counts run in a process pool.
+#
+#              Counts are cached in a JSON file against the state of the data
+#              source on disk (modified time and size of the shapefile's dbf,
+#              the personal geodatabase or SQLite database, or the newest file
+#              in a file geodatabase), so unchanged sources are not counted
+#              again.
+#              Sources with no state to compare, such as sde connections, are
+#              always counted.
+#
+#              The counter is pluggable like the datasourcelib readers:
+#              "arcpy" counts with GetCount, or a cursor pass when there is a
+#                      definition query.
+#              "fast"  reads the count from file headers or metadata, in pure
+#                      Python, for sources that keep a trustworthy one:
+#                      shapefile - dbf header, cross-checked against the shx,
+#                                  less records flagged as deleted
+#                      dBASE     - dbf header, checked against the file size,
+#                                  less records flagged as deleted
+#                      (the deleted flags are read in one pass of the dbf,
+#                      or with a definition query in the same scan as it)
+#                      GeoPackage- gpkg_ogr_contents, when its triggers keep
+#                                  it up to date
+#                      SQLite    - COUNT(*) (also used for GeoPackages with a
+#                                  definition query, which SQLite evaluates)
+#              "auto"  tries "fast" and falls back to "arcpy" for the rest.
+#              Every counter returns (total, filtered, method). With a
+#              definition query both counts come from one scan: SQLite
+#              evaluates it in a CASE, and dBASE tables and arcpy cursors are
+#              evaluated with wherelib; queries wherelib cannot read fall
+#              back to two GetCounts. Text is compared case sensitively in
+#              file geodatabases, shapefiles and dBASE tables and ignoring
+#              case in personal geodatabases, as ArcGIS does; queries
+#              comparing text in other sources are left to GetCount.
+#
+#              Count sources from the command line, without arcpy:
+#                  python rowcountlib.py <data source> [where clause]
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+from __future__ import print_function
+import codecs, datetime, json, os, sqlite3, struct, time
+from datasourcelib import source_key
+from poolutils import no_report, path_part_re, pool_results
+from wherelib import WhereError, compile_where
+
+# Local variables
+CACHE_NAME = "RowCount_cache.json"
+SQLITE_EXTS = (".gpkg", ".sqlite", ".db")
+DBF_VERSIONS = (0x02, 0x03, 0x04, 0x05, 0x30, 0x31, 0x43, 0x63, 0x83, 0x8b, 0xcb, 0xf5, 0xfb)
+
+
+# Functions
+def case_rule(dataSource):
+    """wherelib case rule for text in dataSource, from the ArcGIS SQL
+    reference: "exact" for file geodatabases, shapefiles and dBASE tables,
+    "ignore" for personal geodatabases and None (unknown) otherwise."""
+    lower = dataSource.lower()
+    parts = [part.group() for part in path_part_re.finditer(lower)]
+    if any(part.endswith(".mdb") for part in parts):
+        return "ignore"
+    if lower.endswith((".shp", ".dbf")) or any(part.endswith(".gdb") for part in parts):
+        return "exact"
+    return None
+
+
+def count_arcpy(dataSource, whereClause):
+    """(total, filtered, method) for dataSource. With a where clause wherelib
+    can read, one cursor pass counts both; otherwise two GetCounts."""
+    import arcpy
+    if whereClause:
+        try:
+            predicate, fields = compile_where(whereClause, case_rule(dataSource))
+            total = filtered = 0
+            with arcpy.da.SearchCursor(dataSource, fields or ["OID@"]) as cursor:
+                for row in cursor:
+                    total += 1
+                    if predicate(dict(zip(fields, row))):
+                        filtered += 1
+        except WhereError:
+            return _getcount(dataSource, ""), _getcount(dataSource, whereClause), "GetCount x2"
+        return total, filtered, "cursor scan"
+    return _getcount(dataSource, ""), None, "GetCount"
+
+
+def _getcount(dataSource, whereClause):
+    import arcpy
+    view = "rowcount_{}".format(os.getpid())
+    arcpy.MakeTableView_management(dataSource, view, whereClause)
+    try:
+        return int(arcpy.GetCount_management(view).getOutput(0))
+    finally:
+        arcpy.Delete_management(view)
+
+
+def dbf_header(path):
+    """(records, header length, record length) from a dBASE header, or None
+    if the header does not agree with the size of the file. records counts
+    the records flagged as deleted too."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.read(12)
+    if len(header) < 12 or ord(header[0:1]) not in DBF_VERSIONS:
+        return None
+    records, headerLength, recordLength = struct.unpack("<IHH", header[4:12])
+    expected = headerLength + records * recordLength
+    if recordLength == 0 or size not in (expected, expected + 1):  # optional 0x1A end of file
+        return None
+    return records, headerLength, recordLength
+
+
+def dbf_deleted(path, header, block=4096):
+    """Number of records flagged as deleted, reading just the flag byte of
+    each record from blocks of records. header is from dbf_header."""
+    records, headerLength, recordLength = header
+    deleted = 0
+    with open(path, "rb") as f:
+        f.seek(headerLength)
+        remaining = records
+        while remaining > 0:
+            data = f.read(recordLength * min(block, remaining))
+            count = len(data) // recordLength
+            if count == 0:
+                break
+            remaining -= count
+            deleted += data[:count * recordLength:recordLength].count(b"*")
+    return deleted
+
+
+def dbf_count(path):
+    """Record count of a dBASE file, skipping records flagged as deleted as
+    scan_dbf does (a read of the whole file), or None if the header does not
+    agree with the file."""
+    header = dbf_header(path)
+    return None if header is None else header[0] - dbf_deleted(path, header)
+
+
+def shx_count(path):
+    """Record count from a shapefile index: 8 bytes a record after the
+    100 byte header, or None if the header length and file size differ."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.read(28)
+    if len(header) < 28 or struct.unpack(">i", header[0:4])[0] != 9994:
+        return None
+    length = struct.unpack(">i", header[24:28])[0] * 2
+    if length != size or (size - 100) % 8:
+        return None
+    return (size - 100) // 8
+
+
+def dbf_fields(header):
+    """[(name, type, offset, length, decimals)] from a dBASE header; offsets
+    count the deleted flag at the start of each record."""
+    fields = []
+    offset = 1
+    for pos in range(32, len(header) - 31, 32):
+        if header[pos:pos + 1] == b"\r":
+            break
+        descriptor = header[pos:pos + 32]
+        name = descriptor[:11].split(b"\0")[0].decode("ascii", "replace").upper()
+        fieldType = descriptor[11:12].decode("ascii", "replace").upper()
+        length, decimals = ord(descriptor[16:17]), ord(descriptor[17:18])
+        fields.append((name, fieldType, offset, length, decimals))
+        offset += length
+    return fields
+
+
+def _dbf_decoder(fieldType, encoding):
+    if fieldType == "C":
+        return lambda raw: raw.rstrip(b" \0").decode(encoding, "replace")
+    if fieldType in ("N", "F"):
+        def number(raw):
+            text = raw.strip()
+            if not text or text.startswith(b"*"):
+                return None
+            return float(text) if b"." in text or b"E" in text.upper() else int(text)
+        return number
+    if fieldType == "L":
+        return lambda raw: True if raw in b"TtYy" and raw.strip() else False if raw in b"FfNn" and raw.strip() else None
+    if fieldType == "D":
+        def date(raw):
+            text = raw.strip()
+            if not text or text.strip(b"0") == b"":
+                return None
+            return datetime.datetime.strptime(text.decode("ascii"), "%Y%m%d")
+        return date
+    return lambda raw: raw.decode(encoding, "replace")
+
+
+def _dbf_encoding(path):
+    cpg = os.path.splitext(path)[0] + ".cpg"
+    try:
+        with open(cpg, "r") as f:
+            encoding = f.read().strip()
+        codecs.lookup(encoding)
+        return encoding
+    except (IOError, OSError, LookupError):
+        return "utf-8"
+
+
+def scan_dbf(path, whereClause, block=4096):
+    """(total, filtered) from one pass over a dBASE table. Records flagged as
+    deleted are skipped and text is compared case sensitively, as ArcGIS
+    does. Raises WhereError if the clause cannot be evaluated."""
+    predicate, names = compile_where(whereClause, "exact")
+    with open(path, "rb") as f:
+        header = f.read(32)
+        records, headerLength, recordLength = struct.unpack("<IHH", header[4:12])
+        header += f.read(headerLength - 32)
+        fields = dict((field[0], field) for field in dbf_fields(header))
+        missing = [name for name in names if name not in fields]
+        if missing:
+            raise WhereError("No field {} in {}".format(", ".join(missing), path))
+        encoding = _dbf_encoding(path)
+        readers = [(name, fields[name][2], fields[name][2] + fields[name][3],
+                    _dbf_decoder(fields[name][1], encoding)) for name in names]
+        total = filtered = 0
+        remaining = records
+        while remaining > 0:
+            data = f.read(recordLength * min(block, remaining))
+            count = len(data) // recordLength
+            if count == 0:
+                break
+            remaining -= count
+            for start in range(0, count * recordLength, recordLength):
+                if data[start:start + 1] == b"*":
+                    continue
+                total += 1
+                row = dict((name, decode(data[start + a:start + b])) for name, a, b, decode in readers)
+                if predicate(row):
+                    filtered += 1
+    return total, filtered
+
+
+def _sqlite_source(dataSource):
+    """(database, table) for a table in a GeoPackage or SQLite database."""
+    for part in path_part_re.finditer(dataSource):
+        if part.group().lower().endswith(SQLITE_EXTS):
+            table = dataSource[part.end():].lstrip("\\/")
+            if table.lower().startswith("main."):
+                table = table[5:]
+            return dataSource[:part.end()], table
+    return None
+
+
+def _quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def count_sqlite(database, table, whereClause):
+    """(total, filtered, method) for a GeoPackage or SQLite table. A
+    GeoPackage total comes from gpkg_ogr_contents when the triggers that
+    maintain it exist. A where clause is evaluated by SQLite in the same
+    scan as the total."""
+    if not os.path.isfile(database):
+        raise IOError("No such database: {}".format(database))
+    db = sqlite3.connect(database)
+    try:
+        if not whereClause:
+            row = None
+            try:
+                row = db.execute("SELECT feature_count FROM gpkg_ogr_contents WHERE lower(table_name) = lower(?)",
+                                 (table,)).fetchone()
+                triggers = db.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND "
+                                      "lower(name) IN (lower(?), lower(?))",
+                                      ("trigger_insert_feature_count_" + table,
+                                       "trigger_delete_feature_count_" + table)).fetchone()[0]
+            except sqlite3.Error:
+                triggers = 0
+            if row is not None and row[0] is not None and triggers == 2:
+                return int(row[0]), None, "gpkg_ogr_contents"
+            return db.execute("SELECT count(*) FROM " + _quote(table)).fetchone()[0], None, "sqlite count"
+        total, filtered = db.execute(u"SELECT count(*), total(CASE WHEN ({}) THEN 1 ELSE 0 END) FROM {}".format(
+            whereClause, _quote(table))).fetchone()
+        return total, int(filtered), "sqlite scan"
+    finally:
+        db.close()
+
+
+def count_fast(dataSource, whereClause):
+    """(total, filtered, method) from headers or metadata, or from one pure
+    Python scan of a dBASE table: of the deleted flags alone without a where
+    clause, or scan_dbf with one. None when the source has no header that
+    can be trusted."""
+    sqliteSource = _sqlite_source(dataSource)
+    if sqliteSource is not None:
+        return count_sqlite(sqliteSource[0], sqliteSource[1], whereClause)
+    lower = dataSource.lower()
+    if lower.endswith(".dbf"):
+        dbf = dataSource
+        header = dbf_header(dbf)
+        method = "dbf flag scan"
+    else:
+        base = dataSource[:-4] if lower.endswith(".shp") else dataSource
+        dbf = base + ".dbf"
+        if not (os.path.isfile(base + ".shp") and os.path.isfile(dbf) and os.path.isfile(base + ".shx")):
+            return None
+        header = dbf_header(dbf)
+        # The shx keeps an entry for deleted records too
+        if header is not None and shx_count(base + ".shx") != header[0]:
+            header = None
+        method = "shapefile flag scan"
+    if header is None:
+        return None
+    if whereClause:
+        # One pass gives the total, less deleted records, and the filtered count
+        try:
+            total, filtered = scan_dbf(dbf, whereClause)
+        except WhereError:
+            return None
+        return total, filtered, "dbf scan"
+    return header[0] - dbf_deleted(dbf, header), None, method
+
+
+def count_fast_only(dataSource, whereClause):
+    result = count_fast(dataSource, whereClause)
+    if result is None:
+        raise ValueError("No trustworthy row count in the metadata")
+    return result
+
+
+def count_auto(dataSource, whereClause):
+    try:
+        result = count_fast(dataSource, whereClause)
+    except (IOError, OSError, sqlite3.Error):
+        result = None
+    return result if result is not None else count_arcpy(dataSource, whereClause)
+
+
+COUNTERS = {
+    "arcpy": count_arcpy,
+    "fast": count_fast_only,
+    "auto": count_auto,
+}
+
+
+def _stat_state(path):
+    st = os.stat(path)
+    return "{}:{}".format(st.st_mtime, st.st_size)
+
+
+def source_state(dataSource):
+    """A string that changes when the data source is edited, or None when
+    there is nothing on disk to compare (sde, services, missing sources)."""
+    try:
+        for part in path_part_re.finditer(dataSource):
+            ext = part.group().lower()
+            if ext.endswith(".gdb"):
+                gdb = dataSource[:part.end()]
+                newest = max(os.stat(os.path.join(gdb, name)).st_mtime for name in os.listdir(gdb))
+                return "gdb:{}".format(newest)
+            if ext.endswith((".mdb",) + SQLITE_EXTS):
+                return "file:" + _stat_state(dataSource[:part.end()])
+            if ext.endswith(".sde"):
+                return None
+        base = dataSource[:-4] if dataSource.lower().endswith(".shp") else dataSource
+        if os.path.exists(base + ".dbf"):
+            return "dbf:" + _stat_state(base + ".dbf")
+        return "file:" + _stat_state(dataSource)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def cache_key(dataSource, whereClause):
+    return source_key("", dataSource) + "\n" + (whereClause or "").strip()
+
+
+def load_cache(path):
+    try:
+        with open(path, "r") as f:
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        cache = {}
+    cache.setdefault("counts", {})
+    return cache
+
+
+def count_task(task):
+    """Pool worker. Returns (cache key, total, filtered, method, seconds, error)."""
+    counter, key, dataSource, whereClause = task
+    t0 = time.time()
+    try:
+        total, filtered, method = COUNTERS[counter](dataSource, whereClause)
+        return key, total, filtered, method, time.time() - t0, None
+    except Exception as e:
+        return key, None, None, None, time.time() - t0, "{}: {}".format(type(e).__name__, e)
+
+
+def count_rows(sources, counter="auto", processes=1, cache=None, report=no_report):
+    """Count rows for each (data source, where clause) in sources, which is in
+    TOC order and may repeat. Returns a list in the same order of (total,
+    filtered, method, seconds, error). filtered is the count the where clause
+    keeps, from the same pass as the total, or None without one; seconds is
+    None for a cached count and total is None if the source could not be
+    counted. Each unique pair is counted once, in a process pool when processes > 1,
+    and with a cache (see load_cache) unchanged sources are not counted at all."""
+    t0 = time.time()
+    keys = [cache_key(ds, wc) for ds, wc in sources]
+    unique = {}
+    for key, (ds, wc) in zip(keys, sources):
+        unique.setdefault(key, (ds, wc))
+    counts = {}
+    tasks = []
+    for key in sorted(unique):
+        ds, wc = unique[key]
+        state = source_state(ds)
+        entry = cache["counts"].get(key) if cache is not None else None
+        if state is not None and entry is not None and entry["state"] == state and "total" in entry:
+            counts[key] = (entry["total"], entry["filtered"], "{} (cached)".format(entry["method"]), None, None)
+        else:
+            tasks.append((counter, key, ds, wc))
+            if cache is not None:
+                cache["counts"][key] = {"state": state}
+    report("{} layers, {} unique sources, {} cached, {} to count".format(
+        len(sources), len(unique), len(unique) - len(tasks), len(tasks)))
+    methods = {}
+    try:
+        with pool_results(count_task, tasks, processes) as results:
+            for done, (key, total, filtered, method, seconds, error) in enumerate(results, 1):
+                counts[key] = (total, filtered, method, seconds, error)
+                if error:
+                    report("Could not count {}: {}".format(unique[key][0], error))
+                else:
+                    methods[method] = methods.get(method, 0) + 1
+                    report("{} rows{} in {} by {} ({} of {}, {:.3f} s)".format(
+                        total, "" if filtered is None else ", {} kept by the where clause".format(filtered),
+                        unique[key][0], method, done, len(tasks), seconds))
+                if cache is not None:
+                    if error is None and cache["counts"][key]["state"] is not None:
+                        cache["counts"][key].update(total=total, filtered=filtered, method=method)
+                    else:
+                        del cache["counts"][key]
+    finally:
+        if cache is not None:
+            # Drop entries left without a count by an interrupted run
+            for key in [k for k, entry in cache["counts"].items() if "total" not in entry]:
+                del cache["counts"][key]
+    elapsed = max(time.time() - t0, 1e-6)
+    report("{} sources counted in {:.1f} s ({})".format(len(tasks), elapsed, ", ".join(
+        "{} by {}".format(n, method) for method, n in sorted(methods.items()))))
+    return [counts[key] for key in keys]
+
+
+if __name__ == '__main__':
+    # Count sources without arcpy:  python rowcountlib.py <data source> [where clause]
+    import sys
+    t0 = time.time()
+    result = count_fast(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "")
+    if result is None:
+        print("No trustworthy row count in the metadata of {}".format(sys.argv[1]))
+        sys.exit(1)
+    total, filtered, method = result
+    print("{} rows{} by {} in {:.3f} s".format(
+        total, "" if filtered is None else ", {} kept by the where clause".format(filtered),
+        method, time.time() - t0))
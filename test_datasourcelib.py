@@ -0,0 +1,60 @@
+#
+#---------------------------------------------------------------------------
+#
+# test_datasourcelib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Tests for the data source keys and reverse lookups in
+#              datasourcelib.py. Run with python -m unittest or pytest.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import unittest
+from datasourcelib import DATASOURCE, Inventory, source_key
+
+
+class SourceKeyTest(unittest.TestCase):
+
+    def test_local_path(self):
+        self.assertEqual(source_key("C:\\Data\\Base.gdb", "Roads"), "c:\\data\\base.gdb\\roads")
+
+    def test_local_path_separators(self):
+        self.assertEqual(source_key("C:/Data//Base.gdb/", "ROADS"), "c:\\data\\base.gdb\\roads")
+        self.assertEqual(source_key("", "C:\\Data\\\\Base.gdb\\Roads\\"), "c:\\data\\base.gdb\\roads")
+
+    def test_unc_path(self):
+        self.assertEqual(source_key("\\\\Server\\GIS\\Base.gdb", "Roads"), "\\\\server\\gis\\base.gdb\\roads")
+
+    def test_unc_path_separators(self):
+        self.assertEqual(source_key("//Server/GIS//Base.gdb", "Roads"), "\\\\server\\gis\\base.gdb\\roads")
+        self.assertEqual(source_key("", "\\\\\\Server\\GIS\\Roads.shp"), "\\\\server\\gis\\roads.shp")
+
+
+class LookupTest(unittest.TestCase):
+
+    def setUp(self):
+        self.inventory = Inventory(":memory:")
+        self.inventory.store("Maps\\Roads.mxd", 0, 0, "", [
+            (1, "Roads", "Roads", "\\\\Server\\GIS\\Base.gdb", DATASOURCE),
+            (2, "Parcels", "Parcels", "C:\\Data\\Base.gdb", DATASOURCE)])
+
+    def tearDown(self):
+        self.inventory.close()
+
+    def test_exact(self):
+        found = self.inventory.lookup("\\\\server\\gis\\base.gdb\\roads")
+        self.assertEqual([row[2] for row in found], [1])
+
+    def test_prefix(self):
+        found = self.inventory.lookup("C:/Data", "prefix")
+        self.assertEqual([row[2] for row in found], [2])
+
+    def test_glob(self):
+        found = self.inventory.lookup("\\\\server\\gis\\*", "glob")
+        self.assertEqual([row[2] for row in found], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
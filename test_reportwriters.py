@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+#---------------------------------------------------------------------------
+#
+# test_reportwriters.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Tests for reportwriters.py. Run with python -m unittest or pytest.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+from __future__ import unicode_literals
+import os, shutil, tempfile, unittest, zipfile
+from xml.etree import ElementTree
+import reportwriters
+from reportwriters import open_report
+
+# Local variables
+SHEET_NAME = "Zürich Été"
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+
+class NonAsciiSheetNameTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpDir = tempfile.mkdtemp(prefix="reportwriters_")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpDir, ignore_errors=True)
+
+    def test_xlsx(self):
+        path = os.path.join(self.tmpDir, "report.xlsx")
+        report = open_report(path, "xlsx")
+        report.add_sheet(SHEET_NAME, ["LAYER", "DATA_SOURCE"]).write_rows([["Café", "C:\\Data\\Base.gdb\\Roads"]])
+        report.close()
+        with zipfile.ZipFile(path) as zf:
+            workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+            sheet = zf.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        names = [s.get("name") for s in workbook.iter(MAIN_NS + "sheet")]
+        self.assertEqual(names, [SHEET_NAME])
+        self.assertIn("Café", sheet)
+
+    def test_xlsx_continuation_sheet(self):
+        path = os.path.join(self.tmpDir, "report.xlsx")
+        maxRows = reportwriters.XlsxReport.max_rows
+        reportwriters.XlsxReport.max_rows = 3
+        try:
+            report = open_report(path, "xlsx")
+            report.add_sheet(SHEET_NAME, ["N"]).write_rows([[i] for i in range(4)])
+            report.close()
+        finally:
+            reportwriters.XlsxReport.max_rows = maxRows
+        with zipfile.ZipFile(path) as zf:
+            workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+        names = [s.get("name") for s in workbook.iter(MAIN_NS + "sheet")]
+        self.assertEqual(names, [SHEET_NAME, SHEET_NAME + " (2)"])
+
+    def test_xls(self):
+        try:
+            import xlwt
+        except ImportError:
+            self.skipTest("xlwt is not installed")
+        path = os.path.join(self.tmpDir, "report.xls")
+        report = open_report(path, "xls")
+        report.add_sheet(SHEET_NAME, ["LAYER"]).write_rows([["Café"]])
+        report.close()
+        self.assertTrue(os.path.getsize(path) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
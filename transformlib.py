@@ -0,0 +1,139 @@
+#
+#---------------------------------------------------------------------------
+#
+# transformlib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Text field transforms for RemoveLineBreaks.py, applied to
+#              several fields in one cursor pass. A spec lists fields and the
+#              transforms to run on each, in order:
+#                  ADDRESS=collapse,chomp,truncate:50;SUBURB=trim,upper
+#              A field given without transforms gets collapse, the original
+#              RemoveLineBreaks behaviour. Transforms (TRANSFORMS):
+#                  collapse    - line breaks, tabs and runs of spaces to one
+#                                space, trimmed
+#                  chomp       - the Chomper ASCII fold (chomplib)
+#                  trim        - strip leading and trailing whitespace
+#                  truncate:N  - keep the first N characters
+#                  upper/lower - change case
+#              apply_transforms only writes rows where a value changed, so
+#              clean rows cost a read and no write. NULLs and non text values
+#              are left alone. Has no arcpy dependency.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import time
+from chomplib import Chomper
+from poolutils import no_report
+
+# Local variables
+DEFAULT_TRANSFORM = "collapse"
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+
+# Functions
+def _chomp(txt):
+    # Chomper gives ASCII bytes on Python 2, keep values as text
+    folded = Chomper(txt)
+    return folded.decode("ascii") if isinstance(folded, bytes) else folded
+
+
+def _truncate(arg):
+    try:
+        length = int(arg)
+    except (TypeError, ValueError):
+        raise ValueError("truncate needs a length, e.g. truncate:50")
+    if length < 0:
+        raise ValueError("truncate needs a length of 0 or more")
+    return lambda txt: txt[:length]
+
+
+def _no_arg(name, func):
+    def make(arg):
+        if arg is not None:
+            raise ValueError("{} does not take a value".format(name))
+        return func
+    return make
+
+
+TRANSFORMS = {
+    "collapse": _no_arg("collapse", lambda txt: " ".join(txt.split())),
+    "chomp": _no_arg("chomp", _chomp),
+    "trim": _no_arg("trim", lambda txt: txt.strip()),
+    "truncate": _truncate,
+    "upper": _no_arg("upper", lambda txt: txt.upper()),
+    "lower": _no_arg("lower", lambda txt: txt.lower()),
+}
+
+
+def make_transform(text):
+    """Function for one transform, "name" or "name:value"."""
+    name, sep, arg = text.strip().partition(":")
+    name = name.strip().lower()
+    if name not in TRANSFORMS:
+        raise ValueError("Unknown transform '{}', expected one of {}".format(name, ", ".join(sorted(TRANSFORMS))))
+    return TRANSFORMS[name](arg.strip() if sep else None)
+
+
+def _pipeline(funcs):
+    def run(txt):
+        for func in funcs:
+            txt = func(txt)
+        return txt
+    return run
+
+
+def parse_transforms(spec):
+    """[(field, names, function)] from a spec (see the module description).
+    A field listed twice runs both sets of transforms, in order."""
+    fields = []
+    steps = {}
+    for entry in spec.split(";"):
+        if not entry.strip():
+            continue
+        field, sep, names = entry.partition("=")
+        field = field.strip()
+        names = [n.strip() for n in names.split(",") if n.strip()] if sep else [DEFAULT_TRANSFORM]
+        if not field or not names:
+            raise ValueError("Expected FIELD=transform,... not '{}'".format(entry.strip()))
+        key = field.upper()
+        if key not in steps:
+            fields.append(field)
+            steps[key] = []
+        steps[key].extend(names)
+    if not fields:
+        raise ValueError("No fields to transform")
+    return [(field, steps[field.upper()], _pipeline([make_transform(n) for n in steps[field.upper()]]))
+            for field in fields]
+
+
+def apply_transforms(cursor, transforms, report=no_report, every=100000):
+    """Run each field's transforms over an update cursor opened on the
+    fields in transforms order, writing only rows where a value changed.
+    Returns (rows scanned, rows changed, seconds)."""
+    t0 = time.time()
+    funcs = [func for field, names, func in transforms]
+    scanned = changed = 0
+    for row in cursor:
+        scanned += 1
+        newRow = None
+        for i, func in enumerate(funcs):
+            value = row[i]
+            if isinstance(value, (text_type, str)):
+                newValue = func(value)
+                if newValue != value:
+                    if newRow is None:
+                        newRow = list(row)
+                    newRow[i] = newValue
+        if newRow is not None:
+            cursor.updateRow(newRow)
+            changed += 1
+        if scanned % every == 0:
+            report("{} rows scanned, {} changed".format(scanned, changed))
+    return scanned, changed, time.time() - t0
@@ -0,0 +1,380 @@
+#
+#---------------------------------------------------------------------------
+#
+# wherelib.py
+# Mike Fleming mcfleming@goldcoast.qld.gov.au
+# Created: 18/10/2026
+# Last updated 18/10/2026
+# Description: Evaluates definition query where clauses in Python, so a scan
+#              of a table can count every row and the rows the query keeps in
+#              the same pass. Covers the SQL used in layer definition
+#              queries:
+#                  = <> != < <= > >=   AND OR NOT   ( )
+#                  IN (...)  BETWEEN x AND y  LIKE 'a%_' [ESCAPE 'c']
+#                  IS [NOT] NULL   UPPER() LOWER()   + - * / on numbers
+#                  fields as NAME, "NAME" or [NAME]
+#                  'strings', numbers, date 'YYYY-MM-DD[ hh:mm:ss]'
+#              NULLs follow SQL three valued logic, so a row only counts when
+#              the clause is true. compile_where raises WhereError for
+#              anything else and the caller counts another way.
+#              Text comparisons follow the data source's case rule (see
+#              CASE_RULES): exact for file geodatabases and shapefiles,
+#              ignoring case for personal geodatabases, as the ArcGIS SQL
+#              reference gives them, and where the rule is not known,
+#              comparing text raises WhereError. Text can only be tested for
+#              equality, as ordering follows the database's collation.
+#              So does comparing text with a number, which databases either
+#              reject or convert by their own rules.
+#
+#---------------------------------------------------------------------------
+
+# Import modules
+import datetime, re
+
+# Local variables
+token_re = re.compile(r"""
+    \s*(?:
+    (?P<number>\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?) |
+    (?P<string>'(?:[^']|'')*') |
+    (?P<quoted>"(?:[^"]|"")*"|\[[^\]]*\]) |
+    (?P<name>[A-Za-z_][A-Za-z0-9_.]*) |
+    (?P<op><>|!=|<=|>=|[=<>(),+\-*/])
+    )""", re.VERBOSE)
+KEYWORDS = ("AND", "OR", "NOT", "IN", "IS", "NULL", "LIKE", "ESCAPE", "BETWEEN", "DATE", "TIMESTAMP")
+FUNCTIONS = {"UPPER": lambda v: v.upper(), "LOWER": lambda v: v.lower()}
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y")
+CASE_RULES = ("exact", "ignore", None)  # None: unknown, text comparisons raise WhereError
+
+try:
+    text_type = unicode
+except NameError:  # Python 3
+    text_type = str
+
+
+class WhereError(ValueError):
+    pass
+
+
+# Functions
+def tokenize(whereClause):
+    tokens = []
+    pos = 0
+    text = whereClause.rstrip()
+    while pos < len(text):
+        m = token_re.match(text, pos)
+        if m is None or m.end() == pos:
+            raise WhereError("Cannot read the where clause at: {}".format(text[pos:pos + 20]))
+        kind = m.lastgroup
+        value = m.group(kind)
+        if kind == "name" and value.upper() in KEYWORDS:
+            kind, value = "keyword", value.upper()
+        elif kind == "quoted":
+            kind, value = "name", value[1:-1].replace('""', '"')
+        elif kind == "string":
+            value = value[1:-1].replace("''", "'")
+        tokens.append((kind, value))
+        pos = m.end()
+    return tokens
+
+
+def parse_date(text):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            pass
+    raise WhereError("Cannot read the date '{}'".format(text))
+
+
+def like_regex(pattern, escape=None, ignore_case=False):
+    parts = []
+    chars = iter(pattern)
+    for ch in chars:
+        if escape is not None and ch == escape:
+            parts.append(re.escape(next(chars, "")))
+        elif ch == "%":
+            parts.append(".*")
+        elif ch == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    return re.compile("".join(parts) + r"\Z", re.DOTALL | (re.IGNORECASE if ignore_case else 0))
+
+
+def _is_text(value):
+    return isinstance(value, (str, text_type))
+
+
+def _compare(op, a, b, case_rule="exact"):
+    if a is None or b is None:
+        return None
+    if isinstance(a, datetime.date) != isinstance(b, datetime.date):
+        # A date field against a 'YYYY-MM-DD' string
+        a, b = [parse_date(v) if _is_text(v) else v for v in (a, b)]
+    if _is_text(a) != _is_text(b):
+        raise WhereError("Cannot compare {!r} with {!r}".format(a, b))
+    if _is_text(a):
+        if case_rule is None:
+            raise WhereError("Text comparison with unknown case rules")
+        if op not in ("=", "<>", "!="):
+            raise WhereError("Text ordering depends on the data source's collation")
+        if case_rule == "ignore":
+            a, b = a.lower(), b.lower()
+    if isinstance(a, datetime.date) and not isinstance(a, datetime.datetime):
+        a = datetime.datetime(a.year, a.month, a.day)
+    if isinstance(b, datetime.date) and not isinstance(b, datetime.datetime):
+        b = datetime.datetime(b.year, b.month, b.day)
+    try:
+        if op == "=":
+            return a == b
+        if op in ("<>", "!="):
+            return a != b
+        if op == "<":
+            return a < b
+        if op == "<=":
+            return a <= b
+        if op == ">":
+            return a > b
+        return a >= b
+    except TypeError:
+        raise WhereError("Cannot compare {!r} with {!r}".format(a, b))
+
+
+def _and(a, b):
+    if a is False or b is False:
+        return False
+    if a is None or b is None:
+        return None
+    return True
+
+
+def _or(a, b):
+    if a is True or b is True:
+        return True
+    if a is None or b is None:
+        return None
+    return False
+
+
+def _not(a):
+    return None if a is None else not a
+
+
+class _Parser(object):
+    """Recursive descent parser that builds the clause as nested closures
+    taking a dict of field values."""
+
+    def __init__(self, tokens, case_rule="exact"):
+        self.tokens = tokens
+        self.case_rule = case_rule
+        self.pos = 0
+        self.fields = []
+
+    def peek(self, value=None):
+        if self.pos >= len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        if value is not None and (token[0] not in ("keyword", "op") or token[1] != value):
+            return None
+        return token
+
+    def take(self, value=None):
+        token = self.peek(value)
+        if token is None:
+            raise WhereError("Expected {} in the where clause".format(value or "more"))
+        self.pos += 1
+        return token
+
+    def parse(self):
+        expr = self.disjunction()
+        if self.pos != len(self.tokens):
+            raise WhereError("Unexpected '{}' in the where clause".format(self.tokens[self.pos][1]))
+        return expr
+
+    def disjunction(self):
+        expr = self.conjunction()
+        while self.peek("OR"):
+            self.take()
+            left, right = expr, self.conjunction()
+            expr = lambda row, left=left, right=right: _or(left(row), right(row))
+        return expr
+
+    def conjunction(self):
+        expr = self.negation()
+        while self.peek("AND"):
+            self.take()
+            left, right = expr, self.negation()
+            expr = lambda row, left=left, right=right: _and(left(row), right(row))
+        return expr
+
+    def negation(self):
+        if self.peek("NOT"):
+            self.take()
+            inner = self.negation()
+            return lambda row: _not(inner(row))
+        return self.predicate()
+
+    def predicate(self):
+        if self.peek("("):
+            # A bracketed condition, or a bracketed value that is compared
+            start = self.pos
+            self.take()
+            try:
+                expr = self.disjunction()
+                self.take(")")
+                if self.peek() is None or self.peek()[0] != "op" or self.peek()[1] in ("(", ")", ","):
+                    return expr
+            except WhereError:
+                pass
+            self.pos = start
+        left = self.value()
+        negate = False
+        if self.peek("NOT"):
+            self.take()
+            negate = True
+        token = self.take()
+        if token == ("keyword", "IN"):
+            self.take("(")
+            items = [self.value()]
+            while self.peek(","):
+                self.take()
+                items.append(self.value())
+            self.take(")")
+            rule = self.case_rule
+            expr = lambda row: _in(left(row), [item(row) for item in items], rule)
+        elif token == ("keyword", "BETWEEN"):
+            low = self.value()
+            self.take("AND")
+            high = self.value()
+            rule = self.case_rule
+            expr = lambda row: _and(_compare(">=", left(row), low(row), rule),
+                                    _compare("<=", left(row), high(row), rule))
+        elif token == ("keyword", "LIKE"):
+            pattern = self.take()
+            escape = None
+            if self.peek("ESCAPE"):
+                self.take()
+                escape = self.take()[1]
+            if pattern[0] != "string":
+                raise WhereError("LIKE needs a quoted pattern")
+            if self.case_rule is None:
+                raise WhereError("LIKE with unknown case rules")
+            regex = like_regex(pattern[1], escape, self.case_rule == "ignore")
+            expr = lambda row: _like(regex, left(row))
+        elif token == ("keyword", "IS"):
+            if negate:
+                raise WhereError("NOT before IS")
+            isNot = bool(self.peek("NOT"))
+            if isNot:
+                self.take()
+            self.take("NULL")
+            return lambda row: (left(row) is not None) if isNot else (left(row) is None)
+        elif token[0] == "op" and token[1] in ("=", "<>", "!=", "<", "<=", ">", ">="):
+            if negate:
+                raise WhereError("NOT before a comparison operator")
+            right = self.value()
+            op = token[1]
+            rule = self.case_rule
+            return lambda row: _compare(op, left(row), right(row), rule)
+        else:
+            raise WhereError("Unexpected '{}' in the where clause".format(token[1]))
+        if negate:
+            inner = expr
+            expr = lambda row: _not(inner(row))
+        return expr
+
+    def value(self):
+        expr = self.term()
+        while self.peek("+") or self.peek("-"):
+            op = self.take()[1]
+            left, right = expr, self.term()
+            expr = lambda row, left=left, right=right, op=op: _arith(op, left(row), right(row))
+        return expr
+
+    def term(self):
+        expr = self.atom()
+        while self.peek("*") or self.peek("/"):
+            op = self.take()[1]
+            left, right = expr, self.atom()
+            expr = lambda row, left=left, right=right, op=op: _arith(op, left(row), right(row))
+        return expr
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == "number":
+            number = float(value) if "." in value or "e" in value.lower() else int(value)
+            return lambda row: number
+        if kind == "string":
+            return lambda row: value
+        if kind == "keyword" and value in ("DATE", "TIMESTAMP"):
+            kind, text = self.take()
+            if kind != "string":
+                raise WhereError("{} needs a quoted value".format(value))
+            date = parse_date(text)
+            return lambda row: date
+        if kind == "keyword" and value == "NULL":
+            return lambda row: None
+        if kind == "op" and value == "-":
+            inner = self.atom()
+            return lambda row: _arith("-", 0, inner(row))
+        if kind == "op" and value == "(":
+            inner = self.value()
+            self.take(")")
+            return inner
+        if kind == "name" and value.upper() in FUNCTIONS and self.peek("("):
+            func = FUNCTIONS[value.upper()]
+            self.take("(")
+            inner = self.value()
+            self.take(")")
+            return lambda row: None if inner(row) is None else func(inner(row))
+        if kind == "name":
+            if self.peek("("):
+                raise WhereError("Function {}() is not supported".format(value))
+            field = value.upper()
+            if field not in self.fields:
+                self.fields.append(field)
+            return lambda row: row[field]
+        raise WhereError("Unexpected '{}' in the where clause".format(value))
+
+
+def _in(value, items, case_rule="exact"):
+    if value is None:
+        return None
+    result = False
+    for item in items:
+        result = _or(result, _compare("=", value, item, case_rule))
+    return result
+
+
+def _like(regex, value):
+    if value is None:
+        return None
+    return regex.match(value if isinstance(value, (str, text_type)) else str(value)) is not None
+
+
+def _arith(op, a, b):
+    if a is None or b is None:
+        return None
+    try:
+        if op == "+":
+            return a + b
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        return a / float(b) if b else None
+    except TypeError:
+        raise WhereError("Cannot calculate {!r} {} {!r}".format(a, op, b))
+
+
+def compile_where(whereClause, case_rule="exact"):
+    """(predicate, fields) for a where clause. fields are the upper case
+    field names it uses and predicate takes a dict of them to True, False or
+    None (unknown, from NULLs). case_rule is one of CASE_RULES. Raises
+    WhereError for unsupported SQL, and the predicate raises it for values
+    it cannot compare as the data source would."""
+    if case_rule not in CASE_RULES:
+        raise ValueError("case_rule must be one of {}".format(CASE_RULES))
+    parser = _Parser(tokenize(whereClause), case_rule)
+    expr = parser.parse()
+    return (lambda row: expr(row) is True), parser.fields